@@ -2,7 +2,14 @@ from flask import Flask
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
 from .models.models import db
+from .utills.waiting_room import WaitingRoom
+from .utills.pdf_cache import PdfCache
+from .utills.page_cache import PageCache
+from .utills.metrics import Metrics
+from .utills.search import include_name
+from .utills.user_cache import UserCache
 
 
 login_manager = LoginManager()
@@ -12,36 +19,74 @@ login_manager.login_message = (
 )
 login_manager.login_message_category = "info"
 
+migrate = Migrate()
+waiting_room = WaitingRoom()
+pdf_cache = PdfCache()
+page_cache = PageCache()
+metrics = Metrics()
+user_cache = UserCache()
+
 
 def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
-    # Database initialization
+    # Database initialization, the schema is managed by the migrations, run
+    # `flask db upgrade` on deploy
     db.init_app(app)
+    # The full text index is managed by hand, autogenerate leaves it alone
+    migrate.init_app(app, db, render_as_batch=True, include_name=include_name)
+
+    # Waiting room Initiallization
+    waiting_room.init_app(app)
+
+    # Ticket PDF cache Initiallization
+    pdf_cache.init_app(app)
 
-    # Login manager Initiallization
+    # Page and fragment cache Initiallization
+    page_cache.init_app(app)
+
+    # Login manager Initiallization, the user is loaded from a short lived snapshot
+    # rather than queried on every request
     login_manager.init_app(app)
-    from app.models.models import User
+    user_cache.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
+
+    # Request metrics Initiallization
+    metrics.init_app(app)
 
     # Import Blueprint
     from app.views.user_views import user_bp
     from app.views.event_views import event_bp
     from app.views.ticket_views import ticket_bp
+    from app.views.media_views import media_bp
     from app.errors.error_handler import errors as error_bp
 
     # Register blueprint
     app.register_blueprint(user_bp)
     app.register_blueprint(event_bp)
     app.register_blueprint(ticket_bp)
+    app.register_blueprint(media_bp)
     app.register_blueprint(error_bp)
 
-    # Database creating context
-    with app.app_context():
-        db.create_all()
+    # Image variant URLs for templates
+    from app.utills.images import image_url
+
+    app.add_template_global(image_url)
+
+    # Release expired ticket holds in the background
+    from app.utills.holds import start_hold_reaper
+
+    start_hold_reaper(app)
+
+    # Load the lazily imported libraries and compile the templates up front, for a
+    # gunicorn master whose workers are forked once it is ready
+    if app.config.get("WARM_UP"):
+        from app.utills.warmup import warm_up
+
+        warm_up(app)
 
     return app
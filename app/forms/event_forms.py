@@ -11,6 +11,7 @@ from wtforms import (
     SelectField,
 )
 from wtforms.validators import DataRequired, ValidationError
+from app.forms.validators import ImageLimits
 from flask_wtf.file import FileField, FileAllowed
 from wtforms_components import DateRange
 from wtforms.validators import NumberRange
@@ -30,7 +31,10 @@ class EventForm(FlaskForm):
 
     image = FileField(
         "Event Image",
-        validators=[FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"])],
+        validators=[
+            FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"]),
+            ImageLimits(),
+        ],
     )  #   image: A file field for the event's image. It only accepts certain file formats.
 
     start_date = DateField(
@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import IntegerField, SelectField, SubmitField, StringField, FloatField
 from wtforms.validators import DataRequired, NumberRange
+from app.forms.validators import ImageLimits
 from flask_wtf.file import FileField, FileAllowed
 
 
@@ -20,6 +21,11 @@ class TicketPurchaseForm(FlaskForm):
     submit = SubmitField("Pusrchase")
 
 
+class CheckoutForm(FlaskForm):
+    confirm = SubmitField("Confirm and Pay")
+    cancel = SubmitField("Release Tickets")
+
+
 class TicketTypeForm(FlaskForm):
     ticket_name = StringField("Ticket Name", validators=[DataRequired()])
     ticket_type = StringField("Ticket Type", validators=[DataRequired()])
@@ -35,6 +41,10 @@ class TicketTypeForm(FlaskForm):
         validators=[DataRequired()],
     )
     image = FileField(
-        "Image", validators=[FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"])]
+        "Image",
+        validators=[
+            FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"]),
+            ImageLimits(),
+        ],
     )
     submit = SubmitField("Create Ticket Type")
@@ -9,6 +9,7 @@ from wtforms import (
 )
 from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Optional
 from app.models.models import User
+from app.forms.validators import ImageLimits
 from flask_wtf.file import FileAllowed, FileField
 
 
@@ -65,7 +66,10 @@ class UpdateAccountForm(FlaskForm):
     email = EmailField("Email", validators=[DataRequired(), Email()])
     profile_pic = FileField(
         "Upload profile picture",
-        validators=[FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"])],
+        validators=[
+            FileAllowed(["jpg", "jpeg", "gif", "webp", "png", "tif"]),
+            ImageLimits(),
+        ],
     )
     bio = TextAreaField("About You (Biography)")
     address = StringField("Address", validators=[Optional()])
@@ -73,7 +77,10 @@ class UpdateAccountForm(FlaskForm):
     company_name = StringField("Company Name", validators=[Optional()])
     company_logo = FileField(
         "Upload Company Logo",
-        validators=[FileAllowed(["jpg", "jpeg", "png", "gif", "webp", "tif"])],
+        validators=[
+            FileAllowed(["jpg", "jpeg", "png", "gif", "webp", "tif"]),
+            ImageLimits(),
+        ],
     )
     submit = SubmitField("Update Profile")
 
@@ -0,0 +1,24 @@
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from wtforms.validators import StopValidation
+from app.utills.images import ImageRejected, check_image
+
+
+class ImageLimits(object):
+    """
+    Validates that an uploaded file is an image in a supported format, as read from its
+    header, and that it is small enough to decode, following IMAGE_MAX_BYTES and
+    IMAGE_MAX_PIXELS. Only the header of the file is read.
+    """
+
+    def __call__(self, form, field):
+        if not isinstance(field.data, FileStorage) or not field.data:
+            return
+        try:
+            check_image(
+                field.data.stream,
+                current_app.config["IMAGE_MAX_BYTES"],
+                current_app.config["IMAGE_MAX_PIXELS"],
+            )
+        except ImageRejected as e:
+            raise StopValidation(str(e))
@@ -41,6 +41,8 @@ organizers = db.Table(
     "organizers",
     db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
     db.Column("event_id", db.Integer, db.ForeignKey("event.id"), primary_key=True),
+    # The primary key covers the events of a user, this the organizers of an event
+    db.Index("ix_organizers_event_id_user_id", "event_id", "user_id"),
 )
 
 
@@ -91,6 +93,17 @@ class Event(db.Model):
         CheckConstraint(
             "end_date >= start_date", name="end_date_after_start_date_check"
         ),
+        # Keys of the keyset paginated event listings
+        db.Index("ix_event_created_at_id", "created_at", "id"),
+        db.Index("ix_event_start_date_id", "start_date", "id"),
+        db.Index("ix_event_category_id_start_date", "category_id", "start_date", "id"),
+        # Covers the facet counts of the upcoming events and the price filters
+        db.Index(
+            "ix_event_start_date_price_category_id",
+            "start_date",
+            "price",
+            "category_id",
+        ),
     )
 
 
@@ -180,7 +193,9 @@ class TicketType(db.Model):
     - ticket_name: name of the ticket
     - ticket_type: a string representing the type of ticket (ordinary, VIP, etc.)
     - price: price of the ticket
-    - quantity: total quantity of the type of ticket
+    - quantity: quantity of the type of ticket that is still free to buy
+    - held: quantity of the type of ticket held in buyers' carts
+    - sold: quantity of the type of ticket that has been sold
     - status: status of the ticket, can be 'available', 'sold', 'canceled'
     - image: image associated with the ticket
     - event_id: foreign key to Event model, represents the event to which the ticket is associated
@@ -194,6 +209,8 @@ class TicketType(db.Model):
     ticket_type = db.Column(db.String(120), nullable=False, default="Ordinary")
     price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
+    held = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    sold = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     status = db.Column(
         Enum("available", "sold", "canceled"), nullable=False, default="available"
     )
@@ -203,6 +220,16 @@ class TicketType(db.Model):
         "Event", back_populates="ticket_types", overlaps="ticket_types,ticket_types"
     )
 
+    @property
+    def total_quantity(self):
+        """
+        Returns the total quantity of the type of ticket, free, held and sold, without
+        having to count its tickets.
+        """
+        return self.quantity + self.held + self.sold
+
+    __table_args__ = (db.Index("ix_ticket_type_event_id", "event_id", "id"),)
+
     def __repr__(self):
         return f"TicketType('{self.ticket_name}', '{self.ticket_type}', '{self.price}', '{self.quantity}', '{self.status}')"
 
@@ -217,6 +244,7 @@ class Ticket(db.Model):
     - ticket_type_id: foreign key to TicketType model, represents the type of ticket bought
     - purchase_date: the date the ticket was purchased
     - status: status of the ticket, can be 'unused', 'used', 'cancelled'
+    - order_id: foreign key to Order model, represents the checkout the ticket was bought in
 
     The User and TicketType relationships establish one-to-many relationships with the Ticket model,
     allowing access from the User and TicketType to their associated tickets.
@@ -231,6 +259,7 @@ class Ticket(db.Model):
     use_status = db.Column(
         Enum("unused", "used", "cancelled"), nullable=True, default="unused"
     )
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=True)
     user = db.relationship(
         "User", backref=db.backref("tickets", cascade="all, delete-orphan")
     )
@@ -238,10 +267,93 @@ class Ticket(db.Model):
         "TicketType", backref=db.backref("tickets", cascade="all, delete-orphan")
     )
 
+    __table_args__ = (
+        # A user's tickets, and the tickets of a ticket type by status for check-in
+        db.Index("ix_ticket_user_id_id", "user_id", "id"),
+        db.Index("ix_ticket_ticket_type_id_use_status", "ticket_type_id", "use_status"),
+        db.Index("ix_ticket_order_id", "order_id"),
+    )
+
     def __repr__(self):
         return f"Ticket('{self.id}','{self.status}', owned by User'{self.user_id}' )"
 
 
+class TicketHold(db.Model):
+    """
+    The TicketHold model represents units of a ticket type held in a buyer's cart while
+    the buyer completes the checkout.
+
+    Attributes:
+    - id: unique identifier
+    - user_id: foreign key to User model, represents the user holding the tickets
+    - ticket_type_id: foreign key to TicketType model, represents the type of tickets held
+    - quantity: number of tickets held
+    - created_at: date and time when the hold was created
+    - expires_at: date and time after which the held tickets are released
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    ticket_type_id = db.Column(
+        db.Integer, db.ForeignKey("ticket_type.id"), nullable=False
+    )
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    user = db.relationship("User")
+    ticket_type = db.relationship("TicketType")
+
+    __table_args__ = (
+        db.Index(
+            "ix_ticket_hold_ticket_type_id_expires_at", "ticket_type_id", "expires_at"
+        ),
+    )
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= datetime.utcnow()
+
+    def __repr__(self):
+        return f"TicketHold('{self.id}', '{self.quantity}' tickets, expires '{self.expires_at}')"
+
+
+class Order(db.Model):
+    """
+    The Order model represents a single checkout, in which a user buys one or more
+    tickets of one ticket type.
+
+    Attributes:
+    - id: unique identifier
+    - user_id: foreign key to User model, represents the user who placed the order
+    - event_id: foreign key to Event model, represents the event the tickets are for
+    - ticket_type_id: foreign key to TicketType model, represents the type of tickets bought
+    - quantity: number of tickets bought
+    - price_per_ticket: price of a single ticket at the time of purchase
+    - total_price: total price paid for the order
+    - created_at: date and time when the order was placed
+    - tickets: the tickets (line items) bought in this order
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
+    ticket_type_id = db.Column(
+        db.Integer, db.ForeignKey("ticket_type.id"), nullable=False
+    )
+    quantity = db.Column(db.Integer, nullable=False)
+    price_per_ticket = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user = db.relationship("User", backref=db.backref("orders", lazy="dynamic"))
+    ticket_type = db.relationship("TicketType")
+    tickets = db.relationship("Ticket", backref="order", lazy="dynamic")
+
+    __table_args__ = (db.Index("ix_order_user_id", "user_id"),)
+
+    def __repr__(self):
+        return f"Order('{self.id}', '{self.quantity}' tickets, owned by User'{self.user_id}')"
+
+
 class Category(db.Model):
     """
     The Category model represents a category of events in the database.
@@ -282,13 +394,15 @@ class Contact(db.Model):
 
 class Transactions(db.Model):
     """
-    Model representing a transaction. Each transaction is associated with a user, ticket, and event.
+    Model representing a transaction. Each transaction is associated with a user, ticket, and event,
+    or with the order of a multi-ticket checkout.
     """
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     ticket_id = db.Column(db.Integer, db.ForeignKey("ticket.id"))
     event_id = db.Column(db.Integer, db.ForeignKey("event.id"))
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"))
     status = db.Column(
         Enum("COMPLETED", "FAILED", "PENDING"), nullable=False, default="PENDING"
     )
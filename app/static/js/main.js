@@ -15,6 +15,101 @@ document.addEventListener('DOMContentLoaded', (event) => {
 	// Initial update 
 	updateAmount();
 });
+
+// Waiting room, poll the queue until the visitor is admitted
+const waitingRoom = document.getElementById("waitingRoom");
+if (waitingRoom) {
+	const position = document.getElementById("queuePosition");
+	const wait = document.getElementById("queueWait");
+
+	function pollQueue() {
+		fetch(waitingRoom.dataset.statusUrl)
+			.then((response) => response.json())
+			.then((status) => {
+				if (status.next) {
+					window.location = status.next;
+					return;
+				}
+				position.textContent = status.position;
+				wait.textContent = status.wait;
+				setTimeout(pollQueue, Math.min(Math.max(status.wait, 2), 10) * 1000);
+			})
+			.catch(() => setTimeout(pollQueue, 10000));
+	}
+	setTimeout(pollQueue, 2000);
+}
+
+// Ticket rendering, poll the render job until the ticket can be downloaded, giving
+// up after about two minutes
+const renderJob = document.getElementById("renderJob");
+if (renderJob) {
+	const message = document.getElementById("renderJobMessage");
+	const maxAttempts = 60;
+	let attempts = 0;
+
+	function renderFailed() {
+		message.textContent = "We could not prepare your ticket, please try again later.";
+	}
+
+	function retryRenderJob(delay) {
+		attempts += 1;
+		if (attempts >= maxAttempts) {
+			renderFailed();
+			return;
+		}
+		setTimeout(pollRenderJob, delay);
+	}
+
+	function pollRenderJob() {
+		fetch(renderJob.dataset.statusUrl)
+			.then((response) => response.json())
+			.then((job) => {
+				if (job.status === "done") {
+					window.location = job.url;
+				} else if (job.status === "failed") {
+					renderFailed();
+				} else {
+					retryRenderJob(1000);
+				}
+			})
+			.catch(() => retryRenderJob(5000));
+	}
+	setTimeout(pollRenderJob, 1000);
+}
+
+const checkin = document.getElementById("checkin");
+if (checkin) {
+	const tokenInput = document.getElementById("checkinToken");
+	const result = document.getElementById("checkinResult");
+	const counts = document.getElementById("checkinCounts");
+	const messages = {
+		admitted: "Admitted",
+		duplicate: "Already checked in",
+		wrong_event: "Ticket is for another event",
+		invalid: "Invalid ticket",
+	};
+
+	// Scanners type the QR code contents followed by Enter
+	document.getElementById("checkinForm").addEventListener("submit", (e) => {
+		e.preventDefault();
+		const token = tokenInput.value.trim();
+		tokenInput.value = "";
+		if (!token) return;
+		fetch(checkin.dataset.checkinUrl, {
+			method: "POST",
+			headers: { "Content-Type": "application/json" },
+			body: JSON.stringify({ token: token }),
+		})
+			.then((response) => response.json())
+			.then((scan) => {
+				result.textContent = messages[scan.result] || scan.result;
+				result.className = "mt-3 fw-bold " + (scan.result === "admitted" ? "text-success" : "text-danger");
+				counts.textContent = `${scan.checked_in} checked in, ${scan.remaining} to go`;
+			})
+			.catch(() => (result.textContent = "Scan failed, please try again"));
+	});
+}
+
 const sidebarBtn = document.getElementById("sidebar-toggler");
 const sidebarWrapper = document.getElementById("sidebar-wrapper");
 sidebarBtn.addEventListener('click', () => {
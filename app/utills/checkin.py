@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select, update
+from app.models.models import Ticket, TicketType, organizers, db
+
+# Number of events whose check-in index is kept in memory by a process
+INDEX_CACHE_SIZE = 64
+
+
+class CheckinIndex(object):
+    """
+    In-memory index of the tickets of one event, used at the gates.
+
+    The index is loaded once with a single column query, without loading any Ticket,
+    TicketType or Event objects, and holds the ids of the valid tickets not used yet
+    and of the used tickets. A duplicate scan is rejected from memory.
+    Any other scan marks the ticket used with a conditional UPDATE, which stays the
+    source of truth across processes, and the outcome is written back to the index.
+    """
+
+    def __init__(self, event_id, unused, used):
+        self.event_id = event_id
+        self.unused = set(unused)
+        self.used = set(used)
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, event_id):
+        rows = db.session.execute(
+            select(Ticket.id, Ticket.use_status)
+            .join(TicketType, Ticket.ticket_type_id == TicketType.id)
+            .where(TicketType.event_id == event_id)
+        ).all()
+        unused = [ticket_id for ticket_id, status in rows if status == "unused"]
+        used = [ticket_id for ticket_id, status in rows if status == "used"]
+        return cls(event_id, unused, used)
+
+    def counts(self):
+        with self.lock:
+            return {"checked_in": len(self.used), "remaining": len(self.unused)}
+
+    def check_in(self, token):
+        """
+        Checks in the ticket of a verified token.
+
+        Returns:
+            str: 'admitted', 'duplicate' if the ticket was already used, or 'invalid'
+            if the ticket does not exist anymore or was cancelled.
+        """
+        ticket_id = token.ticket_id
+        with self.lock:
+            if ticket_id in self.used:
+                return "duplicate"
+
+        result = db.session.execute(
+            update(Ticket)
+            .where(
+                Ticket.id == ticket_id,
+                Ticket.ticket_type_id == token.ticket_type_id,
+                Ticket.use_status == "unused",
+            )
+            .values(use_status="used")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            with self.lock:
+                self.unused.discard(ticket_id)
+                self.used.add(ticket_id)
+            return "admitted"
+
+        # Another process checked the ticket in, or it is gone or cancelled
+        status = db.session.scalar(
+            select(Ticket.use_status).where(Ticket.id == ticket_id)
+        )
+        with self.lock:
+            self.unused.discard(ticket_id)
+            if status == "used":
+                self.used.add(ticket_id)
+                return "duplicate"
+        return "invalid"
+
+    def forget(self, ticket_id):
+        with self.lock:
+            self.unused.discard(ticket_id)
+            self.used.discard(ticket_id)
+
+
+def is_organizer(event_id, user_id):
+    """
+    Checks that a user organizes an event, with a single lookup in the organizers
+    table, so the check-in index of an event is only loaded for its organizers.
+    """
+    return (
+        db.session.scalar(
+            select(organizers.c.user_id).where(
+                organizers.c.event_id == event_id, organizers.c.user_id == user_id
+            )
+        )
+        is not None
+    )
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_checkin_index(event_id, ttl):
+    """
+    Returns the check-in index of an event, loading it on first use and reloading it
+    once it is older than `ttl` seconds, so tickets changed outside the gates are
+    picked up. Check is_organizer first.
+    """
+    with _indexes_lock:
+        index = _indexes.get(event_id)
+        if index is not None and time.monotonic() - index.loaded_at < ttl:
+            _indexes.move_to_end(event_id)
+            return index
+
+    index = CheckinIndex.load(event_id)
+    with _indexes_lock:
+        _indexes[event_id] = index
+        _indexes.move_to_end(event_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def forget_ticket(ticket_id):
+    """Drops a ticket from the check-in indexes of this process."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.forget(ticket_id)
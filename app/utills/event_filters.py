@@ -0,0 +1,221 @@
+import json
+from datetime import date, timedelta
+from flask import current_app, request, url_for
+from sqlalchemy import and_, case, exists, extract, func, select
+from app.models.models import Category, Event, TicketType, db
+from app.utills.reference import categories
+
+# (key, label, low, high) of the price bands, a band holds low < price <= high
+PRICE_BANDS = (
+    ("free", "Free", None, 0),
+    ("up-to-20", "Up to 20", 0, 20),
+    ("20-50", "20 to 50", 20, 50),
+    ("50-100", "50 to 100", 50, 100),
+    ("over-100", "Over 100", 100, None),
+)
+# Query arguments that are true
+TRUE_ARGS = ("1", "true", "on", "yes")
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def price_band(key):
+    """Returns the condition of the price band `key` on Event.price, or None."""
+    for band, _, low, high in PRICE_BANDS:
+        if band == key:
+            conditions = []
+            if low is not None:
+                conditions.append(Event.price > low)
+            if high is not None:
+                conditions.append(Event.price <= high)
+            return and_(*conditions)
+    return None
+
+
+def _price_band_case():
+    # The band of each price, the first whose upper bound it is under
+    return case(
+        *[
+            (Event.price <= high, key)
+            for key, _, _, high in PRICE_BANDS
+            if high is not None
+        ],
+        else_=PRICE_BANDS[-1][0],
+    )
+
+
+def _month_end(start):
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(
+        days=1
+    )
+
+
+class EventFilters(object):
+    """
+    The filters of the events list, read from the query arguments:
+
+    - category: name of the category
+    - from, to: first and last start date, as YYYY-MM-DD
+    - price: key of a price band, see PRICE_BANDS
+    - available: only events with tickets on sale
+
+    Arguments that don't parse are ignored, so a filter URL never errors.
+    """
+
+    price_bands = PRICE_BANDS
+
+    def __init__(self, args):
+        self.category = args.get("category", "").strip()
+        self.date_from = _parse_date(args.get("from"))
+        self.date_to = _parse_date(args.get("to"))
+        self.price = args.get("price", "")
+        if price_band(self.price) is None:
+            self.price = ""
+        self.available = args.get("available", "").lower() in TRUE_ARGS
+
+    @property
+    def active(self):
+        return bool(
+            self.category
+            or self.date_from
+            or self.date_to
+            or self.price
+            or self.available
+        )
+
+    def apply(self, query):
+        """
+        Narrows an Event query down to the filtered events.
+
+        The filters only add conditions on the event row, and an EXISTS on its ticket
+        types, so they keep the order and the keyset pagination of the query.
+        """
+        if self.category:
+            # The id from the reference cache, rather than a join, keeps the category
+            # and start date index
+            query = query.filter(Event.category_id == categories.get(self.category))
+        if self.date_from:
+            query = query.filter(Event.start_date >= self.date_from)
+        if self.date_to:
+            query = query.filter(Event.start_date <= self.date_to)
+        if self.price:
+            query = query.filter(price_band(self.price))
+        if self.available:
+            query = query.filter(
+                exists().where(
+                    TicketType.event_id == Event.id,
+                    TicketType.status == "available",
+                    TicketType.quantity > 0,
+                )
+            )
+        return query
+
+    def _url(self, **changes):
+        args = request.args.to_dict()
+        for name in ("after", "before", "page"):
+            args.pop(name, None)
+        args.update(changes)
+        return url_for(
+            "events.list_events",
+            **{name: value for name, value in args.items() if value},
+        )
+
+    def facets(self, counts):
+        """
+        Returns the facets of the filter sidebar, from the counts of facet_counts.
+
+        Returns:
+            dict: A list of choices for each facet, each a dict with its label,
+                count, the URL that applies it and whether it is applied.
+        """
+        today = date.today().isoformat()
+        categories = [
+            {
+                "label": name,
+                "count": count,
+                "url": self._url(category=name, **{"from": self.date_from or today}),
+                "active": name == self.category,
+            }
+            for name, count in counts["categories"]
+        ]
+        months = []
+        for month, count in counts["months"]:
+            start = date.fromisoformat(month + "-01")
+            end = _month_end(start)
+            months.append(
+                {
+                    "label": start.strftime("%B %Y"),
+                    "count": count,
+                    "url": self._url(
+                        **{"from": start.isoformat(), "to": end.isoformat()}
+                    ),
+                    "active": (self.date_from, self.date_to) == (start, end),
+                }
+            )
+        labels = {key: label for key, label, _, _ in PRICE_BANDS}
+        prices = [
+            {
+                "label": labels[key],
+                "count": count,
+                "url": self._url(price=key, **{"from": self.date_from or today}),
+                "active": key == self.price,
+            }
+            for key, count in counts["prices"]
+        ]
+        return {"Category": categories, "Month": months, "Price": prices}
+
+
+def _count_facets(today):
+    upcoming = Event.start_date >= today
+    categories = db.session.execute(
+        select(Category.category_name, func.count(Event.id))
+        .join(Event, Event.category_id == Category.id)
+        .where(upcoming)
+        .group_by(Category.id, Category.category_name)
+        .order_by(Category.category_name)
+    ).all()
+    year, month = extract("year", Event.start_date), extract("month", Event.start_date)
+    months = db.session.execute(
+        select(year, month, func.count(Event.id))
+        .where(upcoming)
+        .group_by(year, month)
+        .order_by(year, month)
+    ).all()
+    band = _price_band_case()
+    bands = dict(
+        db.session.execute(
+            select(band, func.count(Event.id)).where(upcoming).group_by(band)
+        ).all()
+    )
+    return {
+        "categories": [[name, count] for name, count in categories],
+        "months": [[f"{int(y):04d}-{int(m):02d}", count] for y, m, count in months],
+        "prices": [[key, bands[key]] for key, _, _, _ in PRICE_BANDS if bands.get(key)],
+    }
+
+
+def facet_counts():
+    """
+    Returns the number of upcoming events in each category, month and price band.
+
+    Counting groups the whole event table, so the counts are kept in the page cache
+    under the 'events' tag, which every change to an event invalidates, rather than
+    counted on every page view.
+    """
+    today = date.today()
+    cache = current_app.extensions["page_cache"]
+    if not cache.enabled:
+        return _count_facets(today)
+    key = f"facets:{today.isoformat()}"
+    value = cache.get(key)
+    if value is not None:
+        return json.loads(value)
+    versions = cache.versions(["events"])
+    counts = _count_facets(today)
+    cache.set(key, json.dumps(counts), versions)
+    return counts
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from app.models.models import TicketHold, db
+from app.utills.inventory import (
+    hold_tickets,
+    release_held_tickets,
+    sell_held_tickets,
+)
+from app.utills.orders import create_order
+
+
+def create_hold(user_id, ticket_type, quantity, ttl):
+    """
+    Holds a number of units of a ticket type for a buyer while the buyer checks out.
+
+    Args:
+        user_id (int): The id of the user holding the tickets.
+        ticket_type (TicketType): The ticket type to hold units of.
+        quantity (int): The number of units to hold.
+        ttl (int): Number of seconds after which the hold expires.
+
+    Returns:
+        TicketHold: The new hold, or None if the tickets are not available or sold out.
+    """
+    if not hold_tickets(ticket_type.id, quantity):
+        return None
+
+    now = datetime.utcnow()
+    hold = TicketHold(
+        user_id=user_id,
+        ticket_type_id=ticket_type.id,
+        quantity=quantity,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl),
+    )
+    db.session.add(hold)
+    return hold
+
+
+def _take_hold(hold, unexpired):
+    # Deleting the hold row is what claims it, so a confirmation, a cancellation and
+    # the reaper can never act on the same hold twice
+    query = delete(TicketHold).where(TicketHold.id == hold.id)
+    if unexpired:
+        query = query.where(TicketHold.expires_at > datetime.utcnow())
+    return db.session.execute(query).rowcount == 1
+
+
+def confirm_hold(hold):
+    """
+    Turns a hold into an order, with one ticket per held unit.
+
+    Returns:
+        Order: The new order, or None if the hold has expired or was already released.
+    """
+    user_id, ticket_type, quantity = hold.user_id, hold.ticket_type, hold.quantity
+    if not _take_hold(hold, unexpired=True):
+        return None
+    if not sell_held_tickets(ticket_type.id, quantity):
+        return None
+    return create_order(user_id, ticket_type, quantity)
+
+
+def cancel_hold(hold):
+    """
+    Releases a hold, returning its units to the ticket type's free stock.
+
+    Returns:
+        bool: True if the hold was released, False if it was already released.
+    """
+    ticket_type_id, quantity = hold.ticket_type_id, hold.quantity
+    if not _take_hold(hold, unexpired=False):
+        return False
+    return release_held_tickets(ticket_type_id, quantity)
+
+
+def release_expired_holds(batch_size=500, ticket_type_id=None):
+    """
+    Releases a batch of expired holds, returning their units to the free stock.
+
+    The batch is deleted with a single DELETE ... RETURNING statement and the units are
+    given back with one UPDATE per ticket type. Nothing is committed, the caller commits.
+
+    Args:
+        batch_size (int): The maximum number of holds to release.
+        ticket_type_id (int): Only release holds of this ticket type, if given.
+
+    Returns:
+        int: The number of holds released.
+    """
+    now = datetime.utcnow()
+    expired = (
+        select(TicketHold.id)
+        .where(TicketHold.expires_at <= now)
+        .order_by(TicketHold.expires_at)
+        .limit(batch_size)
+    )
+    if ticket_type_id is not None:
+        expired = expired.where(TicketHold.ticket_type_id == ticket_type_id)
+
+    released = db.session.execute(
+        delete(TicketHold)
+        .where(TicketHold.id.in_(expired.scalar_subquery()))
+        .returning(TicketHold.ticket_type_id, TicketHold.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    units = Counter()
+    for released_ticket_type_id, quantity in released:
+        units[released_ticket_type_id] += quantity
+    for released_ticket_type_id, quantity in units.items():
+        release_held_tickets(released_ticket_type_id, quantity)
+    return len(released)
+
+
+def start_hold_reaper(app):
+    """
+    Starts a background thread that periodically releases expired holds in batches.
+
+    The reaper runs every HOLD_REAPER_INTERVAL seconds and releases HOLD_REAPER_BATCH
+    holds per transaction until none are left. An interval of 0 disables it.
+
+    The thread is started by the first request a process serves, since threads do not
+    survive a fork. That way the app can be created in a gunicorn master with
+    --preload, and CLI commands like `flask db upgrade` never start it.
+    """
+    interval = app.config.get("HOLD_REAPER_INTERVAL", 0)
+    batch_size = app.config.get("HOLD_REAPER_BATCH", 500)
+    if not interval:
+        return
+
+    def reap():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    while True:
+                        released = release_expired_holds(batch_size)
+                        db.session.commit()
+                        if released < batch_size:
+                            break
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Releasing expired ticket holds failed")
+
+    reaper_pid = [None]
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_reaper():
+        if reaper_pid[0] == os.getpid():
+            return
+        with lock:
+            if reaper_pid[0] != os.getpid():
+                thread = threading.Thread(target=reap, name="hold-reaper", daemon=True)
+                thread.start()
+                reaper_pid[0] = os.getpid()
@@ -0,0 +1,362 @@
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from flask import current_app, url_for
+from sqlalchemy import select
+from app.models.models import Event, TicketType, User, db
+from app.utills.render_pool import get_render_pool
+
+# Size variants made of every uploaded image: name -> (max width, max height, formats),
+# largest first since each one is scaled from the previous
+VARIANTS = {
+    "detail": (1200, 900, ("webp", "jpg")),
+    # Ticket logos are printed at 4x3 inches, scaled for 150 dpi
+    "logo": (600, 450, ("jpg",)),
+    "card": (480, 360, ("webp", "jpg")),
+    "thumb": (128, 128, ("webp", "jpg")),
+}
+SAVE_OPTIONS = {
+    "webp": dict(format="WEBP", quality=80, method=4),
+    "jpg": dict(format="JPEG", quality=85, optimize=True, progressive=True),
+}
+
+# Uploaded images are named after a hash of their content, anything else in the image
+# folders, like the default images, is a static asset
+CONTENT_NAME = re.compile(r"^[0-9a-f]{32}\.\w+$")
+CONTENT_FILE = re.compile(r"^(variants/)?[0-9a-f]{32}(-\w+)?\.\w+$")
+IMAGE_FOLDERS = ("event_pics", "ticket_pics", "profile_pics", "company_logos")
+
+# Formats accepted on upload, as detected from the file header, not its extension, and
+# the extension they are stored under
+UPLOAD_FORMATS = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "GIF": ".gif",
+    "WEBP": ".webp",
+    "TIFF": ".tiff",
+}
+# JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 scale that is still at least this
+# large, twice the largest variant so downscaling keeps its quality
+DRAFT_SIZE = (2400, 1800)
+CHUNK_SIZE = 64 * 1024
+
+_ready = set()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def variant_filename(image_name, variant, fmt):
+    """Returns the path of an image variant, relative to the image's folder."""
+    stem, _ = os.path.splitext(image_name)
+    return f"variants/{stem}-{variant}.{fmt}"
+
+
+def image_dir(folder):
+    return os.path.join(current_app.root_path, "static", "img", folder)
+
+
+def _image_columns():
+    # Model columns that reference the images of each folder
+    return {
+        "event_pics": [Event.image],
+        "ticket_pics": [TicketType.image],
+        "profile_pics": [User.profile_pic],
+        "company_logos": [User.company_logo],
+    }
+
+
+class ImageRejected(ValueError):
+    """Raised for uploads that are not an accepted image or are too large to decode."""
+
+
+def _open_bounded(fp, max_pixels):
+    """
+    Opens an image reading only its header, and reduces the decode scale of JPEGs.
+
+    Raises ImageRejected if the image is not in UPLOAD_FORMATS or would take more than
+    `max_pixels` pixels once decoded, before any pixel data is read.
+    """
+    # PIL is imported on first use, like the rest of the imaging code, so it does not
+    # slow down the startup of web workers
+    from PIL import Image, UnidentifiedImageError
+
+    too_large = ImageRejected(
+        f"The image is too large, it can be at most {max_pixels // 1000000} megapixels."
+    )
+    try:
+        image = Image.open(fp, formats=tuple(UPLOAD_FORMATS))
+    except Image.DecompressionBombError:
+        raise too_large
+    except UnidentifiedImageError:
+        raise ImageRejected("The file is not a supported image.")
+
+    if image.format == "JPEG":
+        image.draft("RGB", DRAFT_SIZE)
+    if image.width * image.height > max_pixels:
+        raise too_large
+    return image
+
+
+def check_image(stream, max_bytes, max_pixels):
+    """
+    Checks an upload from its size and image header only, without decoding it.
+
+    Args:
+        stream (file): The uploaded file, left at its start.
+        max_bytes (int): The maximum file size.
+        max_pixels (int): The maximum number of decoded pixels.
+
+    Returns:
+        str: The image format detected from the header, a key of UPLOAD_FORMATS.
+
+    Raises:
+        ImageRejected: If the upload is too large or not a supported image.
+    """
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size > max_bytes:
+        raise ImageRejected(
+            f"The image is too large, it can be at most {max_bytes // 1000000} MB."
+        )
+    try:
+        # Closing the image would close the upload, the header is all that was read
+        return _open_bounded(stream, max_pixels).format
+    finally:
+        stream.seek(0)
+
+
+def store_image(image, folder):
+    """
+    Stores an uploaded image under a name derived from its content and queues its
+    variants. Uploading the same image again reuses the stored file.
+
+    The upload is checked with check_image first and copied in chunks while it is
+    hashed, so it is never held in memory as a whole.
+
+    Args:
+        image (FileStorage): The uploaded image.
+        folder (str): The image folder, e.g. 'event_pics'.
+
+    Returns:
+        str: The image name to store on the model.
+
+    Raises:
+        ImageRejected: If the upload is too large or not a supported image.
+    """
+    image_format = check_image(
+        image.stream,
+        current_app.config["IMAGE_MAX_BYTES"],
+        current_app.config["IMAGE_MAX_PIXELS"],
+    )
+
+    directory = image_dir(folder)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fp:
+        for chunk in iter(lambda: image.stream.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            fp.write(chunk)
+
+    # The extension comes from the detected format rather than the client's file name,
+    # so the same content always gets the same name, whatever it was uploaded as
+    image_name = digest.hexdigest()[:32] + UPLOAD_FORMATS[image_format]
+    path = os.path.join(directory, image_name)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        # Bump the modification time, so garbage collection leaves it alone while the
+        # new reference is being committed
+        os.utime(path)
+    else:
+        os.replace(tmp_path, path)
+
+    variant_path(folder, image_name, "thumb")
+    return image_name
+
+
+def _remove_image(folder, image_name):
+    directory = image_dir(folder)
+    stem, _ = os.path.splitext(image_name)
+    _ready.discard((folder, image_name))
+    for path in glob.glob(os.path.join(directory, "variants", stem + "-*")):
+        os.remove(path)
+    try:
+        os.remove(os.path.join(directory, image_name))
+    except FileNotFoundError:
+        pass
+
+
+def _is_collectable(folder, image_name, grace):
+    if not image_name or not CONTENT_NAME.match(image_name):
+        return False
+    try:
+        mtime = os.path.getmtime(os.path.join(image_dir(folder), image_name))
+    except FileNotFoundError:
+        return False
+    return time.time() - mtime > grace
+
+
+def release_image(folder, image_name):
+    """
+    Drops a reference to an image, removing the image and its variants once no row
+    references it anymore. Call it after committing the change that dropped the
+    reference.
+
+    Returns:
+        bool: True if the image was removed.
+    """
+    grace = current_app.config["IMAGE_GC_GRACE"]
+    if not _is_collectable(folder, image_name, grace):
+        return False
+    for column in _image_columns()[folder]:
+        if db.session.scalar(select(column).where(column == image_name).limit(1)):
+            return False
+    _remove_image(folder, image_name)
+    return True
+
+
+def collect_images():
+    """
+    Removes every stored image that no row references, with its variants, along with
+    variants whose image is gone. Images changed in the last IMAGE_GC_GRACE seconds are
+    kept, since their reference may not be committed yet.
+
+    Returns:
+        int: The number of images removed.
+    """
+    grace = current_app.config["IMAGE_GC_GRACE"]
+    removed = 0
+    for folder, columns in _image_columns().items():
+        directory = image_dir(folder)
+        if not os.path.isdir(directory):
+            continue
+        referenced = set()
+        for column in columns:
+            referenced.update(db.session.scalars(select(column).distinct()))
+
+        names = set(os.listdir(directory))
+        for image_name in names:
+            if image_name in referenced:
+                continue
+            if _is_collectable(folder, image_name, grace):
+                _remove_image(folder, image_name)
+                removed += 1
+
+        # Variants still being written are temporary files, see _save_atomic
+        for path in glob.glob(os.path.join(directory, "variants", "*-*.*")):
+            stem = os.path.basename(path).rsplit("-", 1)[0]
+            if not any(name.startswith(stem + ".") for name in names):
+                os.remove(path)
+    return removed
+
+
+def _save_atomic(image, path, fmt):
+    # Write to a temporary file first, so a half written variant is never served
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as fp:
+        image.save(fp, **SAVE_OPTIONS[fmt])
+    os.replace(tmp_path, path)
+
+
+def build_variants(directory, image_name, max_pixels):
+    """
+    Makes every size and format variant of an image stored in `directory`.
+
+    Runs in the render pool, so it only takes plain data. The image size is checked
+    again before decoding, JPEGs are decoded at reduced scale and only the first frame
+    of animated or multi page images is read. The variants are scaled from the largest
+    down, each one from the previous, so the full size image is only resampled once.
+    """
+    from PIL import Image
+
+    os.makedirs(os.path.join(directory, "variants"), exist_ok=True)
+    with open(os.path.join(directory, image_name), "rb") as fp:
+        with _open_bounded(fp, max_pixels) as source:
+            # Scale down before converting, so the RGBA copy is made at variant size
+            source.thumbnail(VARIANTS["detail"][:2])
+            image = source.convert("RGBA")
+
+    for variant, (width, height, formats) in VARIANTS.items():
+        image.thumbnail((width, height))
+        # JPEG has no alpha channel, flatten transparent images on white
+        flat = Image.new("RGB", image.size, "white")
+        flat.paste(image, mask=image.getchannel("A"))
+        for fmt in formats:
+            path = os.path.join(directory, variant_filename(image_name, variant, fmt))
+            _save_atomic(image if fmt == "webp" else flat, path, fmt)
+
+
+def queue_variants(folder, image_name):
+    """
+    Sends an image to the render pool to have its variants made, unless this process
+    already queued it.
+    """
+    key = (folder, image_name)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+
+    app = current_app._get_current_object()
+
+    def done(future):
+        with _pending_lock:
+            _pending.discard(key)
+        if future.exception() is not None:
+            app.logger.error(
+                "Making the variants of %s/%s failed: %s",
+                folder,
+                image_name,
+                future.exception(),
+            )
+
+    future = get_render_pool().submit(
+        build_variants,
+        image_dir(folder),
+        image_name,
+        current_app.config["IMAGE_MAX_PIXELS"],
+    )
+    future.add_done_callback(done)
+
+
+def variant_path(folder, image_name, variant, fmt="jpg"):
+    """
+    Returns the file path of an image variant, or None if it was not made yet, in which
+    case it gets queued.
+    """
+    path = os.path.join(image_dir(folder), variant_filename(image_name, variant, fmt))
+    if (folder, image_name) in _ready:
+        return path
+    # The smallest JPEG is the last variant written, once it is there all of them are
+    last = os.path.join(image_dir(folder), variant_filename(image_name, "thumb", "jpg"))
+    if os.path.exists(last):
+        _ready.add((folder, image_name))
+        return path
+    if os.path.exists(os.path.join(image_dir(folder), image_name)):
+        queue_variants(folder, image_name)
+    return None
+
+
+def image_url(folder, image_name, variant, fmt="jpg"):
+    """
+    Returns the URL of an image variant for templates, falling back to the uploaded
+    image while the variants are being made.
+
+    Args:
+        folder (str): The image folder, e.g. 'event_pics'.
+        image_name (str): The image file name stored on the model.
+        variant (str): One of VARIANTS, e.g. 'card'.
+        fmt (str): 'webp' or 'jpg'.
+    """
+    if variant_path(folder, image_name, variant, fmt) is not None:
+        filename = variant_filename(image_name, variant, fmt)
+    else:
+        filename = image_name
+    if CONTENT_NAME.match(image_name):
+        return url_for("media.image", folder=folder, filename=filename)
+    return url_for("static", filename=f"img/{folder}/{filename}")
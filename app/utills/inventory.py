@@ -0,0 +1,127 @@
+from sqlalchemy import case, update
+from app.models.models import TicketType, db
+
+
+def _move_units(ticket_type_id, quantity, where, values):
+    """
+    Runs the single conditional UPDATE behind every stock movement of a ticket type.
+
+    The database row lock taken by the UPDATE is what serializes concurrent buyers, so
+    there is no read-modify-write round trip and no way for the counters to go negative.
+    The change is part of the current transaction and is rolled back with it.
+
+    Returns:
+        bool: True if the row matched the conditions and was updated.
+    """
+    if quantity < 1:
+        return False
+
+    result = db.session.execute(
+        update(TicketType)
+        .where(TicketType.id == ticket_type_id, *where)
+        .values(**values)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount == 1
+
+
+def _sold_out_status(quantity):
+    # SET expressions see the row as it was before the update
+    return case((TicketType.quantity == quantity, "sold"), else_=TicketType.status)
+
+
+def hold_tickets(ticket_type_id, quantity):
+    """
+    Atomically moves a number of units from a ticket type's free stock to its held stock.
+
+    Args:
+        ticket_type_id (int): The id of the ticket type to hold units of.
+        quantity (int): The number of units to hold.
+
+    Returns:
+        bool: True if the units were held, False if not enough were available.
+    """
+    return _move_units(
+        ticket_type_id,
+        quantity,
+        where=(TicketType.status == "available", TicketType.quantity >= quantity),
+        values=dict(
+            quantity=TicketType.quantity - quantity,
+            held=TicketType.held + quantity,
+            status=_sold_out_status(quantity),
+        ),
+    )
+
+
+def sell_held_tickets(ticket_type_id, quantity):
+    """
+    Atomically moves a number of held units of a ticket type to its sold stock.
+
+    Args:
+        ticket_type_id (int): The id of the ticket type.
+        quantity (int): The number of held units to sell.
+
+    Returns:
+        bool: True if the units were sold, False if not enough units were held.
+    """
+    return _move_units(
+        ticket_type_id,
+        quantity,
+        where=(TicketType.held >= quantity,),
+        values=dict(
+            held=TicketType.held - quantity,
+            sold=TicketType.sold + quantity,
+        ),
+    )
+
+
+def release_held_tickets(ticket_type_id, quantity):
+    """
+    Atomically returns a number of held units of a ticket type to its free stock, and
+    makes a sold out ticket type available again.
+
+    Args:
+        ticket_type_id (int): The id of the ticket type.
+        quantity (int): The number of held units to release.
+
+    Returns:
+        bool: True if the units were released, False if not enough units were held.
+    """
+    return _move_units(
+        ticket_type_id,
+        quantity,
+        where=(TicketType.held >= quantity,),
+        values=dict(
+            quantity=TicketType.quantity + quantity,
+            held=TicketType.held - quantity,
+            status=case(
+                (TicketType.status == "sold", "available"), else_=TicketType.status
+            ),
+        ),
+    )
+
+
+def return_sold_tickets(ticket_type_id, quantity):
+    """
+    Atomically returns a number of sold units of a ticket type to its free stock, when
+    their tickets are deleted, and makes a sold out ticket type available again.
+
+    Args:
+        ticket_type_id (int): The id of the ticket type.
+        quantity (int): The number of sold units to return.
+
+    Returns:
+        bool: True if the units were returned, False if not enough units were sold.
+    """
+    return _move_units(
+        ticket_type_id,
+        quantity,
+        where=(TicketType.sold >= quantity,),
+        values=dict(
+            quantity=TicketType.quantity + quantity,
+            sold=TicketType.sold - quantity,
+            status=case(
+                (TicketType.status == "sold", "available"), else_=TicketType.status
+            ),
+        ),
+    )
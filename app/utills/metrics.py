@@ -0,0 +1,253 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from flask import Response, g, has_request_context, request, template_rendered
+from flask import before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds between two writes of a worker's metrics to the shared directory
+FLUSH_INTERVAL = 1.0
+# File of the shared directory holding the metrics of the workers that exited
+EXITED_FILE = "exited.json"
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    "request_duration_seconds": (
+        "Time spent handling a request",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "sql_queries": (
+        "Number of SQL queries run by a request",
+        (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    ),
+    "sql_duration_seconds": (
+        "Time spent in SQL queries by a request",
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    "render_duration_seconds": (
+        "Time spent rendering templates by a request",
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    "response_size_bytes": (
+        "Size of the response body, streamed responses are not counted",
+        (1000, 10000, 50000, 100000, 500000, 1000000, 10000000),
+    ),
+}
+
+
+class Metrics(object):
+    """
+    Per request instrumentation, grouped by endpoint and exposed on /metrics as
+    Prometheus histograms.
+
+    Every request records its latency, the number of SQL queries it ran and the time
+    they took, the time spent rendering templates and the size of its response. Each
+    worker process keeps its histograms in memory and writes them to a shared
+    directory at most once per FLUSH_INTERVAL, and /metrics adds up the files of all
+    the workers of the host, so a scrape sees every worker whichever one serves it.
+    The gunicorn master folds the file of a worker that exits into the totals of the
+    exited workers, and empties the directory when it starts, see gunicorn.conf.py.
+    With METRICS_SERVER_TIMING on, responses also carry a Server-Timing header with
+    the figures of the request, for the browser's developer tools.
+
+    Configuration:
+    - METRICS_ENABLED: record and expose the metrics
+    - METRICS_DIR: the shared directory, defaults to the instance folder
+    - METRICS_SERVER_TIMING: add the Server-Timing header to responses
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.server_timing = False
+        self._data = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get("METRICS_ENABLED", False):
+            return
+        self.server_timing = app.config.get("METRICS_SERVER_TIMING", False)
+        self.directory = app.config.get("METRICS_DIR") or os.path.join(
+            app.instance_path, "metrics"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._end_render, app)
+        # Engines are created lazily, listen on all of them
+        if not event.contains(Engine, "before_cursor_execute", _start_query):
+            event.listen(Engine, "before_cursor_execute", _start_query)
+            event.listen(Engine, "after_cursor_execute", _end_query)
+        app.add_url_rule("/metrics", "metrics", self.view)
+        app.extensions["metrics"] = self
+
+    def _start_request(self):
+        g.metrics = {"start": time.perf_counter(), "queries": 0, "sql": 0.0}
+        g.metrics.update(render=0.0, render_depth=0)
+
+    def _start_render(self, sender, template, context, **extra):
+        stats = g.get("metrics")
+        if stats is not None:
+            # Only time the outermost template, render_template can be nested
+            if stats["render_depth"] == 0:
+                stats["render_start"] = time.perf_counter()
+            stats["render_depth"] += 1
+
+    def _end_render(self, sender, template, context, **extra):
+        stats = g.get("metrics")
+        if stats is not None and stats["render_depth"] > 0:
+            stats["render_depth"] -= 1
+            if stats["render_depth"] == 0:
+                stats["render"] += time.perf_counter() - stats["render_start"]
+
+    def _end_request(self, response):
+        stats = g.pop("metrics", None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats["start"]
+        endpoint = request.endpoint or "unmatched"
+        observations = {
+            "request_duration_seconds": duration,
+            "sql_queries": stats["queries"],
+            "sql_duration_seconds": stats["sql"],
+            "render_duration_seconds": stats["render"],
+        }
+        if not response.is_streamed:
+            observations["response_size_bytes"] = response.calculate_content_length()
+        self.observe(endpoint, observations)
+
+        if self.server_timing:
+            response.headers["Server-Timing"] = (
+                f'db;dur={stats["sql"] * 1000:.1f};desc="{stats["queries"]} queries", '
+                f'render;dur={stats["render"] * 1000:.1f}, '
+                f"total;dur={duration * 1000:.1f}"
+            )
+        return response
+
+    def observe(self, endpoint, observations):
+        """Records the observations of one request of an endpoint."""
+        with self._lock:
+            for name, value in observations.items():
+                if value is None:
+                    continue
+                buckets = HISTOGRAMS[name][1]
+                # Counts per bucket, then the +Inf count and the sum
+                series = self._data.setdefault(name, {}).setdefault(
+                    endpoint, [0] * (len(buckets) + 1) + [0.0]
+                )
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        series[i] += 1
+                series[-2] += 1
+                series[-1] += value
+            flush = time.monotonic() - self._flushed_at >= FLUSH_INTERVAL
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Writes this worker's histograms to the shared directory."""
+        with self._lock:
+            data = json.dumps(self._data)
+            self._flushed_at = time.monotonic()
+        _write(os.path.join(self.directory, f"{os.getpid()}.json"), data)
+
+    def collect(self):
+        """Returns the histograms of all the workers added up."""
+        self.flush()
+        total = {}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            _add(total, _read(path))
+        return total
+
+    def mark_process_dead(self, pid):
+        """
+        Adds the histograms of an exited worker to those of the workers that exited
+        before it and removes its file, so the totals keep counting up and the files
+        don't pile up. Called by the gunicorn master, the only writer of the file of
+        the exited workers.
+        """
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f"{pid}.json")
+        if not os.path.exists(path):
+            return
+        exited_path = os.path.join(self.directory, EXITED_FILE)
+        total = _read(exited_path)
+        _add(total, _read(path))
+        _write(exited_path, json.dumps(total))
+        os.remove(path)
+
+    def clear(self):
+        """Removes the files of all the workers, when the server starts."""
+        if self.directory is None:
+            return
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def view(self):
+        lines = []
+        for name, series in sorted(self.collect().items()):
+            help_text, buckets = HISTOGRAMS[name]
+            metric = "moristickets_" + name
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for endpoint, values in sorted(series.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(buckets, values):
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {values[-2]}')
+                lines.append(f"{metric}_sum{{{label}}} {values[-1]}")
+                lines.append(f"{metric}_count{{{label}}} {values[-2]}")
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def _read(path):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, data):
+    # Through a temporary file, so a scrape never reads half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
+
+
+def _add(total, data):
+    for name, series in data.items():
+        if name not in HISTOGRAMS:
+            continue
+        for endpoint, values in series.items():
+            current = total.setdefault(name, {}).get(endpoint)
+            if current is None:
+                total[name][endpoint] = list(values)
+            else:
+                total[name][endpoint] = [a + b for a, b in zip(current, values)]
+
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    if has_request_context():
+        stats = g.get("metrics")
+        if stats is not None:
+            stats["queries"] += 1
+            stats["sql"] += time.perf_counter() - start
@@ -0,0 +1,66 @@
+from datetime import datetime
+from sqlalchemy import insert
+from app.models.models import Order, Ticket, Transactions, db
+
+
+def create_order(user_id, ticket_type, quantity):
+    """
+    Writes the order row, all of its tickets and the matching transaction for units
+    that have already been sold from the ticket type's stock, see confirm_hold.
+
+    The tickets are inserted with one bulk INSERT ... RETURNING statement instead of one
+    ORM object per ticket, so the cost of a checkout stays flat as the quantity grows.
+    Nothing is committed, the caller commits or rolls back the whole checkout.
+
+    Args:
+        user_id (int): The id of the user placing the order.
+        ticket_type (TicketType): The ticket type bought.
+        quantity (int): The number of tickets bought.
+
+    Returns:
+        Order: The new order.
+    """
+    now = datetime.utcnow()
+    total_price = ticket_type.price * quantity
+    order = Order(
+        user_id=user_id,
+        event_id=ticket_type.event_id,
+        ticket_type_id=ticket_type.id,
+        quantity=quantity,
+        price_per_ticket=ticket_type.price,
+        total_price=total_price,
+        created_at=now,
+    )
+    db.session.add(order)
+    db.session.flush()
+
+    ticket_ids = db.session.scalars(
+        insert(Ticket).returning(Ticket.id, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": user_id,
+                "ticket_type_id": ticket_type.id,
+                "order_id": order.id,
+                "purchase_date": now,
+                "use_status": "unused",
+            }
+            for _ in range(quantity)
+        ],
+    ).all()
+
+    db.session.add(
+        Transactions(
+            user_id=user_id,
+            ticket_id=ticket_ids[0] if quantity == 1 else None,
+            event_id=ticket_type.event_id,
+            order_id=order.id,
+            status="COMPLETED",
+            date=now,
+            quantity=quantity,
+            price_per_ticket=ticket_type.price,
+            total_price=total_price,
+            payment_method="balance",
+            payment_date=now,
+        )
+    )
+    return order
@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, session
+from flask_login import current_user
+from markupsafe import Markup
+
+# Expired entries are pruned every PRUNE_EVERY writes of a process
+PRUNE_EVERY = 200
+
+# An entry is fresh while none of its tags was invalidated since it was stored
+_GET_SQL = """
+    SELECT value FROM entry
+    WHERE key = ? AND expires_at > ? AND NOT EXISTS (
+        SELECT 1 FROM entry_tag
+        LEFT JOIN tag ON tag.name = entry_tag.tag
+        WHERE entry_tag.key = entry.key
+        AND COALESCE(tag.version, 0) != entry_tag.version
+    )
+"""
+
+
+class PageCache(object):
+    """
+    Cache of rendered pages and template fragments, invalidated by tags.
+
+    Every entry is stored with the tags of the entities it was rendered from, like
+    'event:12' or 'testimonials', and the version each tag had before rendering.
+    Invalidating a tag bumps its version, which makes every entry stored with an
+    older version a miss, so a render that races an invalidation is never served.
+    Entries also expire after PAGE_CACHE_TTL seconds.
+
+    The cache lives in a small SQLite file, so it is shared by all the workers of a
+    host without an external service.
+
+    Configuration:
+    - PAGE_CACHE_TTL: seconds an entry is served, 0 disables the cache
+    - PAGE_CACHE_DB: path of the SQLite file, defaults to the instance folder
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.ttl = 0
+        self._local = threading.local()
+        self._writes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("PAGE_CACHE_TTL", 0)
+        self.path = app.config.get("PAGE_CACHE_DB") or os.path.join(
+            app.instance_path, "page_cache.db"
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Drop the connections to the file of a previous app
+        self._local = threading.local()
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entry (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS entry_tag (
+                    key TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (key, tag)
+                );
+                CREATE TABLE IF NOT EXISTS tag (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                );
+                """
+            )
+        finally:
+            conn.close()
+        app.add_template_global(self.fragment, "cache_fragment")
+        app.extensions["page_cache"] = self
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _conn(self):
+        # One connection per thread, opened after any fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def versions(self, tags):
+        """Returns the current version of each tag, 0 for tags never invalidated."""
+        tags = list(tags)
+        rows = self._conn().execute(
+            f"SELECT name, version FROM tag WHERE name IN ({','.join('?' * len(tags))})",
+            tags,
+        )
+        versions = dict.fromkeys(tags, 0)
+        versions.update(rows)
+        return versions
+
+    def get(self, key):
+        """Returns a cached value, or None if it is missing, expired or invalidated."""
+        row = self._conn().execute(_GET_SQL, (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, versions):
+        """
+        Stores a value with the tag versions read before it was rendered.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entry (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl),
+            )
+            conn.execute("DELETE FROM entry_tag WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO entry_tag (key, tag, version) VALUES (?, ?, ?)",
+                [(key, tag, version) for tag, version in versions.items()],
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM entry_tag WHERE key IN "
+                    "(SELECT key FROM entry WHERE expires_at <= ?)",
+                    (now,),
+                )
+                conn.execute("DELETE FROM entry WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def invalidate(self, *tags):
+        """Invalidates every entry stored with any of the tags."""
+        if not self.enabled or not tags:
+            return
+        self._conn().executemany(
+            "INSERT INTO tag (name, version) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET version = version + 1",
+            [(tag,) for tag in tags],
+        )
+
+    def fragment(self, key, tags, render):
+        """
+        Returns a cached template fragment, rendering and storing it on a miss. Used
+        through the `cached` macro of cache.html, with the macro's caller as `render`.
+        `tags` can be a callable, for tags that take a query to find, which is then
+        only run on a miss.
+        """
+        if not self.enabled:
+            return render()
+        key = "fragment:" + key
+        value = self.get(key)
+        if value is not None:
+            return Markup(value)
+        versions = self.versions(tags() if callable(tags) else tags)
+        value = render()
+        self.set(key, str(value), versions)
+        return value
+
+
+def cached_page(tags):
+    """
+    Decorator that caches the rendered page of a view for anonymous visitors.
+
+    Only GET requests without flashed messages are cached and served from the cache,
+    logged in users always get a fresh page.
+
+    Args:
+        tags (callable): Returns the tags of the page from the view's arguments.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions["page_cache"]
+            if (
+                not cache.enabled
+                or request.method != "GET"
+                or current_user.is_authenticated
+                or session.get("_flashes")
+            ):
+                return view(*args, **kwargs)
+
+            key = "page:" + request.full_path
+            value = cache.get(key)
+            if value is not None:
+                page = json.loads(value)
+                return page["body"], 200, {"Content-Type": page["content_type"]}
+
+            versions = cache.versions(tags(*args, **kwargs))
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                page = {
+                    "body": response.get_data(as_text=True),
+                    "content_type": response.content_type,
+                }
+                cache.set(key, json.dumps(page), versions)
+            return response
+
+        return wrapper
+
+    return decorator
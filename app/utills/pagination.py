@@ -0,0 +1,174 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """Encodes the sort key of a row as an opaque, URL safe cursor."""
+    values = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    """
+    Decodes a cursor back to the sort key values of `keys`.
+
+    Returns:
+        list: The key values, or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(keys):
+            return None
+        decoded = []
+        for key, value in zip(keys, values):
+            python_type = key.type.python_type
+            if python_type in (date, datetime):
+                decoded.append(python_type.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        return decoded
+    except (ValueError, TypeError):
+        return None
+
+
+class Page(object):
+    """
+    A page of rows. Iterating it yields the rows, and next_url and prev_url link to
+    the neighbouring pages of the current view, keeping the other query arguments.
+    """
+
+    # Query arguments that select the page
+    page_args = ()
+
+    def __init__(self, items, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _url(self, **page):
+        args = request.args.to_dict()
+        for name in self.page_args:
+            args.pop(name, None)
+        args.update(request.view_args or {})
+        args.update(page)
+        return url_for(request.endpoint, **args)
+
+
+class KeysetPage(Page):
+    """A page of rows fetched with keyset pagination, see keyset_paginate."""
+
+    page_args = ("after", "before")
+
+    def __init__(self, items, keys, has_next, has_prev):
+        super().__init__(items, has_next, has_prev)
+        self.keys = keys
+
+    def _cursor(self, item):
+        return encode_cursor([getattr(item, key.key) for key in self.keys])
+
+    @property
+    def next_url(self):
+        if not self.has_next or not self.items:
+            return None
+        return self._url(after=self._cursor(self.items[-1]))
+
+    @property
+    def prev_url(self):
+        if not self.has_prev or not self.items:
+            return None
+        return self._url(before=self._cursor(self.items[0]))
+
+
+class NumberedPage(Page):
+    """A page of rows fetched by page number, see offset_paginate."""
+
+    page_args = ("page",)
+
+    def __init__(self, items, number, has_next):
+        super().__init__(items, has_next, has_prev=number > 1)
+        self.number = number
+
+    @property
+    def next_url(self):
+        return self._url(page=self.number + 1) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self._url(page=self.number - 1) if self.has_prev else None
+
+
+def keyset_paginate(query, keys, per_page, descending=True):
+    """
+    Fetches one page of a query with keyset (seek) pagination.
+
+    Instead of an OFFSET, the page starts right after or before the sort key of a row
+    given as a cursor in the `after` or `before` query argument, so the database seeks
+    straight to it through the index on `keys` and a page costs the same at any depth.
+    The last key must be unique, like the primary key, so the order is total.
+
+    Args:
+        query (Query): The query to paginate, without an ORDER BY.
+        keys (list): The columns to sort on, e.g. [Event.created_at, Event.id].
+        per_page (int): The number of rows per page.
+        descending (bool): Sort on the keys in descending order.
+
+    Returns:
+        KeysetPage: The page.
+    """
+    after = request.args.get("after")
+    before = request.args.get("before")
+    backwards = before is not None and after is None
+    cursor = decode_cursor(before if backwards else after or "", keys)
+    if cursor is None:
+        after = before = None
+        backwards = False
+
+    # Going backwards walks the index the other way, then flips the page
+    walk_descending = descending != backwards
+    if cursor is not None:
+        row, bound = tuple_(*keys), tuple_(*cursor)
+        query = query.filter(row < bound if walk_descending else row > bound)
+    order = [key.desc() if walk_descending else key.asc() for key in keys]
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+        return KeysetPage(items, keys, has_next=True, has_prev=more)
+    return KeysetPage(items, keys, has_next=more, has_prev=after is not None)
+
+
+def offset_paginate(query, per_page, max_page=50):
+    """
+    Fetches one page of a query by the page number in the `page` query argument.
+
+    Only meant for ordered results the database has to compute in full before it can
+    return the first row anyway, like search results by rank, where skipping rows
+    costs little more. Everything else is paginated with keyset_paginate.
+
+    Args:
+        query (Query): The query to paginate, with its ORDER BY.
+        per_page (int): The number of rows per page.
+        max_page (int): The last page that can be requested.
+
+    Returns:
+        NumberedPage: The page.
+    """
+    number = min(max(request.args.get("page", 1, type=int), 1), max_page)
+    items = query.offset((number - 1) * per_page).limit(per_page + 1).all()
+    has_next = len(items) > per_page and number < max_page
+    return NumberedPage(items[:per_page], number, has_next)
@@ -0,0 +1,146 @@
+import glob
+import os
+import tempfile
+
+
+class PdfCache(object):
+    """
+    Disk backed cache of rendered ticket PDFs with least recently used eviction.
+
+    Files are named after the ticket id and a version that changes whenever anything
+    printed on the ticket changes, so a stale PDF is never served and storing a new
+    version drops the old one. A cache hit only bumps the file's modification time,
+    which is the recency used for eviction, and the view sends the file as it is.
+    Once the files grow past PDF_CACHE_MAX_BYTES the least recently used ones are
+    removed until the cache is back under 90% of the cap. The directory is shared by
+    all the workers, so its size is counted from the files, but only every
+    SCAN_EVERY puts of a process, or sooner once the size counted at the last scan
+    plus what the process stored since passes the cap. Other workers can push the
+    cache over the cap in between, by at most their own SCAN_EVERY PDFs each.
+
+    Configuration:
+    - PDF_CACHE_MAX_BYTES: size cap of the cache, 0 disables the cache
+    - PDF_CACHE_DIR: directory of the cache, defaults to the instance folder
+    """
+
+    SCAN_EVERY = 50
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        # Size estimate and number of puts since the last scan, the first put scans
+        self._size = None
+        self._puts = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get("PDF_CACHE_MAX_BYTES", 0)
+        self.directory = app.config.get("PDF_CACHE_DIR") or os.path.join(
+            app.instance_path, "ticket_pdfs"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions["pdf_cache"] = self
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, ticket_id, version, extension="pdf"):
+        return os.path.join(self.directory, f"{ticket_id}-{version}.{extension}")
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.pdf")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, ticket_id, version):
+        """
+        Returns the path of a cached PDF and marks it as recently used, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        path = self._path(ticket_id, version)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, ticket_id, version, pdf):
+        """
+        Stores a rendered PDF, replacing older versions of the same ticket.
+
+        Returns:
+            str: The path of the cached PDF, or None if the cache is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        for stale in glob.glob(os.path.join(self.directory, f"{ticket_id}-*.*")):
+            self.discard(stale)
+
+        # Write to a temporary file first, so other workers never see half a PDF
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(pdf)
+        path = self._path(ticket_id, version)
+        os.replace(tmp_path, path)
+
+        self._puts += 1
+        if self._size is None or self._puts >= self.SCAN_EVERY:
+            self.evict()
+        else:
+            self._size += len(pdf)
+            if self._size > self.max_bytes:
+                self.evict()
+        return path
+
+    def mark_failed(self, ticket_id, version):
+        """
+        Leaves a marker that rendering this version of a ticket failed, which every
+        worker sees, until the PDF is stored or the marker cleared.
+        """
+        if self.enabled:
+            open(self._path(ticket_id, version, "failed"), "wb").close()
+
+    def failed(self, ticket_id, version):
+        """Returns whether rendering this version of a ticket was marked as failed."""
+        return self.enabled and os.path.exists(self._path(ticket_id, version, "failed"))
+
+    def clear_failed(self, ticket_id, version):
+        self.discard(self._path(ticket_id, version, "failed"))
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Removes the least recently used PDFs until the cache is under 90% of its cap,
+        if it is over the cap. Other workers share the directory, so the size is
+        counted from the files rather than kept in this process.
+        """
+        entries = self._entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        self._size, self._puts = size, 0
+        if size <= self.max_bytes:
+            return
+        entries.sort(key=lambda entry: entry[2])
+        target = self.max_bytes * 0.9
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
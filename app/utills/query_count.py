@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.models.models import db
+
+
+class QueryCounter(object):
+    """Collects the SQL statements an engine runs while it is listening."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Counts the queries run on an engine, the app's engine by default, inside the block.
+
+    The listener sees every connection of the engine, so only count in a process that
+    serves one request at a time, like the test client.
+
+    Yields:
+        QueryCounter: The counter, complete once the block exits.
+    """
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """
+    Fails with an AssertionError listing the statements if the block runs more than
+    `limit` queries.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"{counter.count} queries run, at most {limit} expected:\n"
+            + "\n".join(counter.statements)
+        )
@@ -0,0 +1,133 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.models.models import Category, db
+
+# Key of the session's info holding the names created in its transaction
+PENDING_KEY = "reference_pending"
+
+
+class ReferenceCache(object):
+    """
+    In-process cache of a reference table, a small table of unique names like the
+    categories, mapping each name to its id.
+
+    Looking a name up is a dictionary hit once it was seen. A name missing from the
+    cache is looked up in the database, so one created by another process is found
+    on first use. The whole list of names, which can't tell what it misses, is
+    reloaded when the shared version of the cache's tag in the page cache changes,
+    which every process bumps when it creates a name, or after
+    REFERENCE_CACHE_TTL seconds.
+
+    Names are created with an upsert in the caller's transaction and only enter the
+    cache once it commits, so a rollback never leaves a dangling id behind.
+    """
+
+    def __init__(self, model, column, tag):
+        self.model = model
+        self.column = column
+        self.tag = tag
+        self._ids = {}
+        self._complete = False
+        self._loaded_at = 0.0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        cache = current_app.extensions["page_cache"]
+        return cache.versions([self.tag])[self.tag] if cache.enabled else None
+
+    def _load(self):
+        version = self._shared_version()
+        rows = db.session.execute(select(self.column, self.model.id)).all()
+        with self._lock:
+            self._ids = dict(rows)
+            self._complete = True
+            self._loaded_at = time.monotonic()
+            self._version = version
+
+    def names(self):
+        """Returns every name, sorted."""
+        ttl = current_app.config["REFERENCE_CACHE_TTL"]
+        if (
+            not self._complete
+            or time.monotonic() - self._loaded_at >= ttl
+            or self._shared_version() != self._version
+        ):
+            self._load()
+        with self._lock:
+            return sorted(self._ids)
+
+    def get(self, name):
+        """Returns the id of a name, or None if there is no such row."""
+        with self._lock:
+            row_id = self._ids.get(name)
+        if row_id is not None:
+            return row_id
+        row_id = db.session.scalar(select(self.model.id).where(self.column == name))
+        # A row this transaction created is only remembered once it commits
+        pending = db.session.info.get(PENDING_KEY, ())
+        if row_id is not None and (self, name, row_id) not in pending:
+            self._remember(name, row_id)
+        return row_id
+
+    def get_or_create(self, name):
+        """
+        Returns the id of a name, inserting its row if there is none.
+
+        The insert ignores a row created at the same time by another request, so
+        concurrent creations of the same name both get its id instead of one of them
+        failing on the unique constraint. It is part of the caller's transaction.
+        """
+        row_id = self.get(name)
+        if row_id is not None:
+            return row_id
+
+        table = self.model.__table__
+        values = {self.column.key: name}
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            db.session.execute(
+                insert(table)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=[self.column.name])
+            )
+        else:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(values))
+            except IntegrityError:
+                pass
+        row_id = db.session.scalar(select(self.model.id).where(self.column == name))
+        db.session.info.setdefault(PENDING_KEY, []).append((self, name, row_id))
+        return row_id
+
+    def _remember(self, name, row_id):
+        with self._lock:
+            self._ids[name] = row_id
+
+
+categories = ReferenceCache(Category, Category.category_name, "categories")
+
+
+@event.listens_for(db.session, "after_commit")
+def _commit_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    for cache, name, row_id in pending:
+        cache._remember(name, row_id)
+    # Other processes reload their list of names
+    current_app.extensions["page_cache"].invalidate(
+        *{cache.tag for cache, _, _ in pending}
+    )
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_pending(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,73 @@
+import threading
+from app.utills.ticket_pdf import render_tickets_pdf
+
+# Render jobs submitted by this process that are still running
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def job_id_for(ticket_id, version):
+    return f"{ticket_id}-{version}"
+
+
+def parse_job_id(job_id):
+    """
+    Returns the (ticket_id, version) of a render job id, or None if it is malformed.
+    """
+    ticket_id, _, version = job_id.partition("-")
+    if not ticket_id.isdigit() or not version.isalnum():
+        return None
+    return int(ticket_id), version
+
+
+def submit_render(pool, pdf_cache, data, version, queue_depth):
+    """
+    Enqueues the rendering of a ticket's PDF to the render pool.
+
+    The finished PDF is stored in the PDF cache, and the job id is simply the cache key,
+    so any web worker can tell whether a job is done by looking at the cache, whichever
+    worker the job was submitted to. A failed job leaves a marker in the cache for the
+    same reason, which submitting the job again clears. A job that is already running
+    is not submitted twice.
+
+    Returns:
+        str: The job id, or None if `queue_depth` jobs are already running.
+    """
+    ticket_id = data["ticket_id"]
+    job_id = job_id_for(ticket_id, version)
+    with _jobs_lock:
+        if job_id in _jobs:
+            return job_id
+        if len(_jobs) >= queue_depth:
+            return None
+        pdf_cache.clear_failed(ticket_id, version)
+        future = pool.submit(render_tickets_pdf, [data])
+        _jobs[job_id] = future
+
+    def store(future):
+        try:
+            if future.exception() is not None:
+                pdf_cache.mark_failed(ticket_id, version)
+            else:
+                pdf_cache.put(ticket_id, version, future.result())
+        finally:
+            with _jobs_lock:
+                _jobs.pop(job_id, None)
+
+    future.add_done_callback(store)
+    return job_id
+
+
+def job_status(pdf_cache, job_id):
+    """
+    Returns the status of a render job, 'done', 'failed' or 'pending'.
+
+    A job is done once its PDF is in the cache, and failed once the cache holds its
+    failure marker. Any other job is reported as pending.
+    """
+    ticket_id, version = parse_job_id(job_id)
+    if pdf_cache.get(ticket_id, version) is not None:
+        return "done"
+    if pdf_cache.failed(ticket_id, version):
+        return "failed"
+    return "pending"
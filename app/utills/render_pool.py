@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def get_render_pool():
+    """
+    Returns the process pool that renders ticket PDFs off the web worker, creating it
+    on first use with RENDER_WORKERS processes.
+
+    The work sent to the pool only takes plain data and never touches the database or
+    the application context. The pool processes are started by a forkserver, or
+    spawned where there is none, rather than forked from the web worker, whose threads
+    could hold locks, like the database pool's, that the fork would copy held.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited through a fork belongs to the parent, make a new one
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config["RENDER_WORKERS"],
+                mp_context=multiprocessing.get_context(_START_METHOD),
+            )
+            _pool_pid = os.getpid()
+    return _pool
@@ -0,0 +1,152 @@
+import re
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, event, func
+from sqlalchemy import and_, literal_column, or_
+from app.models.models import Event, db
+
+# Only the words of a search are used, so user input is never read as query syntax
+WORD = re.compile(r"\w+")
+MAX_TERMS = 8
+# Columns searched by the fallback of databases without a full text index
+SEARCHED_COLUMNS = (Event.event_name, Event.description, Event.venue)
+
+# SQLite: an FTS5 index over the event table, filled and kept in sync by triggers on
+# every insert, update and delete. The event name weighs most in the ranking, then the
+# venue, then the description.
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5(
+        event_name, description, venue,
+        content='event', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    "INSERT INTO event_fts(event_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_insert AFTER INSERT ON event BEGIN
+        INSERT INTO event_fts(rowid, event_name, description, venue)
+        VALUES (new.id, new.event_name, new.description, new.venue);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_delete AFTER DELETE ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, event_name, description, venue)
+        VALUES ('delete', old.id, old.event_name, old.description, old.venue);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_update
+    AFTER UPDATE OF event_name, description, venue ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, event_name, description, venue)
+        VALUES ('delete', old.id, old.event_name, old.description, old.venue);
+        INSERT INTO event_fts(rowid, event_name, description, venue)
+        VALUES (new.id, new.event_name, new.description, new.venue);
+    END
+    """,
+    "INSERT INTO event_fts(event_fts) VALUES ('rebuild')",
+]
+
+# PostgreSQL: a generated tsvector column with a GIN index, the venue has weight B so
+# location searches can match it alone
+POSTGRESQL_DDL = [
+    """
+    ALTER TABLE event ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(event_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(venue, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_event_search_vector ON event USING gin (search_vector)",
+]
+SEARCH_DDL = {"sqlite": SQLITE_DDL, "postgresql": POSTGRESQL_DDL}
+
+# The FTS5 table, outside the models' metadata so create_all leaves it alone
+_event_fts = Table(
+    "event_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("event_fts", Text),
+    Column("rank", Float),
+)
+
+
+@event.listens_for(Event.__table__, "after_create")
+def create_search_index(target, connection, **kw):
+    # The migrations create the index, this is for databases made with create_all
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Event.__table__, "after_drop")
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS event_fts")
+
+
+def include_name(name, type_, parent_names):
+    """Hides the full text index from the autogenerated migrations."""
+    if type_ == "table":
+        return not name.startswith("event_fts")
+    return name not in ("search_vector", "ix_event_search_vector")
+
+
+def search_terms(text):
+    return WORD.findall(text.lower())[:MAX_TERMS]
+
+
+def search_events(query, text="", location=""):
+    """
+    Narrows an Event query down to the events that match a full text search, ordered
+    from the best match, through the database's full text index.
+
+    Every word has to match, as a prefix, so a search can be typed out partially. On
+    databases other than SQLite and PostgreSQL, which have no index for it, every word
+    has to be found anywhere in the columns and the events are not ranked.
+
+    Args:
+        query (Query): The Event query to search in.
+        text (str): Words to look for in the name, venue and description.
+        location (str): Words to look for in the venue only.
+
+    Returns:
+        Query: The ordered query, or None if there are no words to search for.
+    """
+    words, places = search_terms(text), search_terms(location)
+    if not words and not places:
+        return None
+
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        match = " ".join(
+            [f'"{word}"*' for word in words] + [f'venue : "{word}"*' for word in places]
+        )
+        return (
+            query.join(_event_fts, _event_fts.c.rowid == Event.id)
+            .filter(_event_fts.c.event_fts.op("MATCH")(match))
+            .order_by(_event_fts.c.rank, Event.id)
+        )
+    if dialect == "postgresql":
+        vector = literal_column("event.search_vector")
+        tsquery = func.to_tsquery(
+            "english",
+            " & ".join(
+                [f"{word}:*" for word in words] + [f"{word}:*B" for word in places]
+            ),
+        )
+        return query.filter(vector.op("@@")(tsquery)).order_by(
+            func.ts_rank_cd(vector, tsquery).desc(), Event.id
+        )
+
+    # Other databases have no index to search, every word is looked up anywhere in
+    # the columns instead, slower and unranked, so the list keeps its date order
+    def contains(column, word):
+        return column.ilike("%" + word.replace("_", "\\_") + "%", escape="\\")
+
+    return query.filter(
+        and_(
+            *[
+                or_(*[contains(column, word) for column in SEARCHED_COLUMNS])
+                for word in words
+            ],
+            *[contains(Event.venue, word) for word in places],
+        )
+    ).order_by(Event.start_date, Event.id)
@@ -0,0 +1,111 @@
+import io
+import zipfile
+from collections import deque
+from app.models.models import Event, Ticket, TicketType, User, db
+from app.utills.ticket_pdf import render_tickets_pdf, ticket_pdf_data
+
+
+class _ZipStream(io.RawIOBase):
+    """
+    A write only, unseekable file that collects what the zip writer produces until it
+    is drained, so an archive can be sent while it is being written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_ticket_pdf_data(event_id, ticket_type_id=None, chunk_size=500):
+    """
+    Yields the PDF data of every ticket of an event, or of one of its ticket types.
+
+    Only the printed columns are selected and the rows are fetched in chunks, so no
+    Ticket, TicketType or Event objects are loaded and memory stays flat.
+    """
+    query = (
+        db.session.query(
+            Ticket.id,
+            Ticket.use_status,
+            Ticket.purchase_date,
+            User.id,
+            User.username,
+            TicketType.id,
+            TicketType.price,
+            TicketType.image,
+            Event.id,
+            Event.event_name,
+            Event.image,
+        )
+        .join(User, Ticket.user_id == User.id)
+        .join(TicketType, Ticket.ticket_type_id == TicketType.id)
+        .join(Event, TicketType.event_id == Event.id)
+        .filter(Event.id == event_id)
+    )
+    if ticket_type_id is not None:
+        query = query.filter(TicketType.id == ticket_type_id)
+
+    for row in query.order_by(Ticket.id).yield_per(chunk_size):
+        yield ticket_pdf_data(*row)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_batches(pool, batches, window):
+    """
+    Renders batches of tickets in a process pool, yielding (batch, pdf) in order.
+
+    At most `window` batches are in flight at once, so a slow client never makes
+    rendered PDFs pile up in memory.
+    """
+    pending = deque()
+    for batch in batches:
+        pending.append((batch, pool.submit(render_tickets_pdf, batch)))
+        if len(pending) >= window:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+    while pending:
+        batch, future = pending.popleft()
+        yield batch, future.result()
+
+
+def stream_tickets_zip(pool, event_id, ticket_type_id=None, batch_size=100, window=4):
+    """
+    Yields a zip archive of the tickets of an event, or of one of its ticket types, as
+    it is being written.
+
+    Every entry is a multi-page PDF of up to `batch_size` tickets, one ticket per page,
+    rendered by the process pool while earlier entries are already being sent.
+    """
+    tickets = iter_ticket_pdf_data(event_id, ticket_type_id)
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for batch, pdf in render_batches(pool, _batches(tickets, batch_size), window):
+            first, last = batch[0]["ticket_id"], batch[-1]["ticket_id"]
+            if first == last:
+                name = f"ticket-{first}.pdf"
+            else:
+                name = f"tickets-{first}-{last}.pdf"
+            archive.writestr(name, pdf)
+            yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1,102 @@
+import hashlib
+import os
+from flask import current_app
+from app.utills.ticket_token import make_ticket_token
+from app.utills.images import variant_path
+
+
+def ticket_pdf_data(
+    ticket_id,
+    use_status,
+    purchase_date,
+    user_id,
+    username,
+    ticket_type_id,
+    price,
+    ticket_type_image,
+    event_id,
+    event_name,
+    event_image,
+):
+    """
+    Returns everything that is printed on a ticket's PDF as a plain dict.
+
+    Rendering only works from this dict, never from ORM objects or the application
+    context, so tickets can be rendered in other processes.
+    """
+    if ticket_type_image is not None:
+        folder, image_name = "ticket_pics", ticket_type_image
+    else:
+        folder, image_name = "event_pics", event_image
+    # Use the logo variant made on upload, the original only gets scaled until it exists
+    logo_source = variant_path(folder, image_name, "logo")
+    logo_scaled = logo_source is not None
+    if not logo_scaled:
+        logo_source = os.path.join(
+            current_app.root_path, "static", "img", folder, image_name
+        )
+    return {
+        "ticket_id": ticket_id,
+        "use_status": use_status,
+        "purchase_date": purchase_date,
+        "user_id": user_id,
+        "username": username,
+        "ticket_type_id": ticket_type_id,
+        "price": price,
+        "event_id": event_id,
+        "event_name": event_name,
+        "logo_source": logo_source,
+        "logo_scaled": logo_scaled,
+        "logo_dir": os.path.join(current_app.instance_path, "ticket_logos"),
+        "token": make_ticket_token(
+            current_app.config["SECRET_KEY"], ticket_id, event_id, ticket_type_id
+        ),
+    }
+
+
+def ticket_pdf_data_for(ticket):
+    """Returns the PDF data of a Ticket model instance."""
+    ticket_type = ticket.ticket_type
+    event = ticket_type.event
+    return ticket_pdf_data(
+        ticket.id,
+        ticket.use_status,
+        ticket.purchase_date,
+        ticket.user.id,
+        ticket.user.username,
+        ticket_type.id,
+        ticket_type.price,
+        ticket_type.image,
+        event.id,
+        event.event_name,
+        event.image,
+    )
+
+
+def ticket_pdf_version(data):
+    """
+    Returns a short hash of everything that is printed on a ticket's PDF, so the
+    version changes whenever the ticket's status or its ticket type, event or owner
+    data changes.
+    """
+    fields = sorted((key, str(value)) for key, value in data.items())
+    return hashlib.sha1(repr(fields).encode()).hexdigest()[:16]
+
+
+def render_tickets_pdf(tickets):
+    """
+    Renders the PDF of one or more tickets, one ticket per page, each with the ticket
+    information and a QR code.
+
+    The PDF, QR code and imaging libraries are only imported on the first render, so
+    web workers that never render a ticket do not pay for them at startup.
+
+    Args:
+        tickets (list): PDF data dicts of the tickets, see ticket_pdf_data.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    from app.utills.ticket_render import render_pdf
+
+    return render_pdf(tickets)
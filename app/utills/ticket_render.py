@@ -0,0 +1,223 @@
+import copy
+import hashlib
+import os
+import qrcode
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image as PILImage
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_JUSTIFY
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.graphics.shapes import Drawing, Rect
+from app.utills.images import VARIANTS
+
+# Ticket PDF rendering. It pulls in reportlab, qrcode and PIL, so it is only imported
+# on the first render, through ticket_pdf.render_tickets_pdf
+
+LOGO_PIXELS = VARIANTS["logo"][:2]
+TEMPLATE_CACHE_SIZE = 256
+
+# Embed image streams as binary, ASCII85 encoding them is pure Python and costs more
+# than the rest of the document build
+rl_config.useA85 = 0
+
+
+class TicketTemplate(object):
+    """
+    The parts of a ticket PDF that are the same for every ticket of a ticket type: the
+    logo variant, a JPEG already at print size that reportlab embeds without decoding it,
+    and the static ticket information paragraphs. Each render only copies the prepared
+    flowables and adds the per-ticket fields and the QR code.
+    """
+
+    def __init__(self, key, logo_path, paragraphs):
+        self.key = key
+        self.logo_path = logo_path
+        self.paragraphs = paragraphs
+
+    def paragraph(self, name):
+        # Flowables get laid out in place, so every document gets its own copy
+        return copy.copy(self.paragraphs[name])
+
+
+_styles = None
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+
+
+def get_styles():
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        # Add a Justified style
+        styles.add(
+            ParagraphStyle(
+                name="Justify",
+                parent=styles["Normal"],
+                alignment=TA_JUSTIFY,
+                leftIndent=85,
+                rightIndent=15,
+            )
+        )
+        _styles = styles
+    return _styles
+
+
+def _scale_logo(source, source_mtime, directory):
+    """
+    Scales a logo down to the size it is printed at and stores it as a JPEG in the
+    instance folder, shared by all workers, for images whose logo variant is not made
+    yet. Returns the path of the scaled logo.
+    """
+    name = hashlib.sha1(f"{source}:{source_mtime}".encode()).hexdigest()[:16]
+    path = os.path.join(directory, name + ".jpg")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    with PILImage.open(source) as image:
+        image = image.convert("RGB")
+        image.thumbnail(LOGO_PIXELS)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            image.save(fp, "JPEG", quality=90)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _build_template(data, key, source_mtime):
+    styles = get_styles()
+    paragraphs = {
+        "event_name": Paragraph(f"Event Name: {data['event_name']}", styles["Justify"]),
+        "event_id": Paragraph(f"Event ID: {data['event_id']}", styles["Justify"]),
+        "ticket_type_id": Paragraph(
+            f"Ticket Type ID: {data['ticket_type_id']}", styles["Justify"]
+        ),
+        "price": Paragraph(f"Ticket Price: ${data['price']}", styles["Justify"]),
+    }
+    if data["logo_scaled"]:
+        logo_path = data["logo_source"]
+    else:
+        logo_path = _scale_logo(data["logo_source"], source_mtime, data["logo_dir"])
+    return TicketTemplate(key, logo_path, paragraphs)
+
+
+def get_ticket_template(data):
+    """
+    Returns the prepared template of a ticket's ticket type, building it on first use.
+
+    Templates are kept in process for the TEMPLATE_CACHE_SIZE most recently used ticket
+    types. A template is rebuilt when the ticket type or event image, or the event or
+    price data printed on the ticket, changes.
+    """
+    source_mtime = os.path.getmtime(data["logo_source"])
+    key = (
+        data["logo_source"],
+        source_mtime,
+        data["price"],
+        data["event_id"],
+        data["event_name"],
+    )
+    ticket_type_id = data["ticket_type_id"]
+
+    with _templates_lock:
+        template = _templates.get(ticket_type_id)
+        if template is not None and template.key == key:
+            _templates.move_to_end(ticket_type_id)
+            return template
+
+    template = _build_template(data, key, source_mtime)
+    with _templates_lock:
+        _templates[ticket_type_id] = template
+        _templates.move_to_end(ticket_type_id)
+        while len(_templates) > TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+    return template
+
+
+def _qr_drawing(token, size):
+    """
+    Returns the QR code of a ticket token as a vector drawing, built in memory with
+    one rectangle per run of dark modules, so there is no image to encode or decode.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+    qr.add_data(token)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    module = size / len(matrix)
+    drawing = Drawing(size, size)
+    drawing.hAlign = "CENTER"
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < len(row) and row[x]:
+                x += 1
+            drawing.add(
+                Rect(
+                    start * module,
+                    size - (y + 1) * module,
+                    (x - start) * module,
+                    module,
+                    fillColor=colors.black,
+                    strokeColor=None,
+                )
+            )
+    return drawing
+
+
+def _ticket_elements(data):
+    """Returns the flowables of a single ticket page."""
+    template = get_ticket_template(data)
+    styles = get_styles()
+
+    # Build the PDF Elements
+    elements = []
+    # Add company logo
+    elements.append(Image(template.logo_path, width=4 * inch, height=3 * inch))
+    elements.append(Spacer(1, 0.25 * inch))
+
+    # Add Ticket Information
+    elements.append(Paragraph(f"User: {data['username']}", styles["Justify"]))
+    elements.append(template.paragraph("event_name"))
+    elements.append(template.paragraph("event_id"))
+    elements.append(template.paragraph("ticket_type_id"))
+    elements.append(
+        Paragraph(
+            f"Purchase Date/Time: {data['purchase_date'].strftime('%B %d, %Y, %I:%M %p')}",
+            styles["Justify"],
+        )
+    )
+    elements.append(template.paragraph("price"))
+    elements.append(
+        Paragraph(f"Ticket Status: {data['use_status']}", styles["Justify"])
+    )
+    # Add QR code
+    elements.append(_qr_drawing(data["token"], 2 * inch))
+    return elements
+
+
+def render_pdf(tickets):
+    """Renders the PDF of one or more tickets, see ticket_pdf.render_tickets_pdf."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+    elements = []
+    for data in tickets:
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(_ticket_elements(data))
+
+    # Generate PDF
+    doc.build(elements)
+    return buffer.getvalue()
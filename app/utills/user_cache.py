@@ -0,0 +1,105 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from sqlalchemy.orm.util import identity_key
+from app.models.models import User, db
+
+# Key of the session's info holding the ids of the users changed in its transaction
+CHANGED_KEY = "user_cache_changed"
+
+
+class UserCache(object):
+    """
+    Loads the logged in user of flask_login without a query on every request.
+
+    Each process keeps a snapshot of the columns of the users it recently loaded. On
+    a hit the user is rebuilt from the snapshot and merged into the request's session
+    without loading it, so it is attached like a queried user, changes to it are
+    saved on commit, and later lookups by primary key in the request, like
+    db.session.get(User, id), are identity map hits instead of queries.
+
+    Any commit that updates or deletes a user drops its snapshot, and bumps the
+    user's 'user:<id>' tag in the page cache so the other processes drop theirs. A
+    snapshot is also dropped after USER_CACHE_TTL seconds, which bounds how stale it
+    can get in other processes when the page cache is off. Code that decides on a
+    snapshot's value, like spending the balance, should refresh the user first.
+
+    Configuration:
+    - USER_CACHE_TTL: seconds a snapshot is used, 0 loads the user every request
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.page_cache = None
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("USER_CACHE_TTL", 0)
+        self.page_cache = app.extensions["page_cache"]
+        app.extensions["user_cache"] = self
+
+    def _version(self, user_id):
+        if not self.page_cache.enabled:
+            return None
+        tag = f"user:{user_id}"
+        return self.page_cache.versions([tag])[tag]
+
+    def load(self, user_id):
+        """Returns the user with the id, attached to the session, or None."""
+        user = db.session.identity_map.get(identity_key(User, user_id))
+        if user is not None or self.ttl <= 0:
+            return user or db.session.get(User, user_id)
+
+        version = self._version(user_id)
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+        if snapshot is not None:
+            values, loaded_at, snapshot_version = snapshot
+            if time.monotonic() - loaded_at < self.ttl and snapshot_version == version:
+                user = User(**values)
+                make_transient_to_detached(user)
+                return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            values = {
+                column.key: getattr(user, column.key)
+                for column in User.__mapper__.column_attrs
+            }
+            with self._lock:
+                self._snapshots[user_id] = (values, time.monotonic(), version)
+        return user
+
+    def forget(self, *user_ids):
+        """Drops the snapshots of users, in this process and the others."""
+        with self._lock:
+            for user_id in user_ids:
+                self._snapshots.pop(user_id, None)
+        if self.page_cache is not None:
+            self.page_cache.invalidate(*[f"user:{user_id}" for user_id in user_ids])
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_KEY, set()).add(target.id)
+
+
+@event.listens_for(db.session, "after_commit")
+def _forget_changed(session):
+    changed = session.info.pop(CHANGED_KEY, None)
+    if changed and "user_cache" in current_app.extensions:
+        current_app.extensions["user_cache"].forget(*changed)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_changed(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGED_KEY, None)
@@ -1,25 +1,13 @@
-import os
-import secrets
-from PIL import Image
-from flask import current_app, flash, jsonify
+from flask import flash, jsonify
 from app.models.models import Contact, db
+from app.utills.images import store_image
 
 
 def image_saver(image, folder):
     try:
-        img_name_base = secrets.token_hex(8)
-        _, file_ext = os.path.splitext(image.filename)
-        image_name = img_name_base + file_ext
-        image_path = os.path.join(
-            current_app.root_path, "static/img/" + folder, image_name
-        )
-
-        # Image resizing
-        img_size = (400, 400)
-        i = Image.open(image)
-        i.thumbnail(img_size)
-        i.save(image_path, quality=95)
-        return image_name
+        # Images are named after their content and their size variants are made in
+        # the render pool
+        return store_image(image, folder)
     except Exception as e:
         flash(f"An error occurred while saving the image: {e}")
 
@@ -0,0 +1,234 @@
+import math
+import os
+import sqlite3
+import time
+from functools import wraps
+from flask import current_app, render_template
+from flask_login import current_user
+
+
+# Version of the tables of the SQLite file, older files are recreated, the queue only
+# holds short lived state
+SCHEMA_VERSION = 2
+
+
+class WaitingRoom(object):
+    """
+    Admission control for the ticket purchase path of busy events.
+
+    Every logged in visitor that reaches the purchase page of an event joins its
+    queue, and visitors are let in at a fixed number per second per event. Each event
+    earns admission credits with time at that rate, never more than one second worth,
+    so an idle event admits a small burst straight away and an on-sale spike is
+    metered. Credits are spent on the head of the queue, in order. An admission stays
+    valid for WAITING_ROOM_PASS_TTL seconds, after which the visitor has to queue
+    again.
+
+    Visitors keep their place by polling the queue. One that hasn't been seen for
+    WAITING_ROOM_IDLE_TIMEOUT seconds left the page, and is dropped from the queue
+    before it is admitted, so it doesn't take the place of the visitors behind it.
+
+    The queue lives in a small SQLite file, separate from the main database, so it is
+    shared by all the workers of a host and polling it never touches the main database.
+
+    Configuration:
+    - WAITING_ROOM_RATE: visitors admitted per second per event, 0 disables the room
+    - WAITING_ROOM_PASS_TTL: seconds an admission stays valid
+    - WAITING_ROOM_IDLE_TIMEOUT: seconds a queued visitor keeps its place unseen
+    - WAITING_ROOM_DB: path of the SQLite file, defaults to the instance folder
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.rate = 0
+        self.pass_ttl = 0
+        self.idle_timeout = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rate = app.config.get("WAITING_ROOM_RATE", 0)
+        self.pass_ttl = app.config.get("WAITING_ROOM_PASS_TTL", 600)
+        self.idle_timeout = app.config.get("WAITING_ROOM_IDLE_TIMEOUT", 30)
+        self.path = app.config.get("WAITING_ROOM_DB") or os.path.join(
+            app.instance_path, "waiting_room.db"
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS gate")
+                conn.execute("DROP TABLE IF EXISTS queue")
+                conn.execute(
+                    """
+                    CREATE TABLE gate (
+                        event_id INTEGER PRIMARY KEY,
+                        issued INTEGER NOT NULL,
+                        credits REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TABLE queue (
+                        event_id INTEGER NOT NULL,
+                        visitor TEXT NOT NULL,
+                        position INTEGER NOT NULL,
+                        admitted_at REAL,
+                        seen_at REAL NOT NULL,
+                        PRIMARY KEY (event_id, visitor)
+                    )
+                    """
+                )
+                conn.execute(
+                    "CREATE INDEX ix_queue_position ON queue (event_id, position)"
+                )
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        app.extensions["waiting_room"] = self
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def check(self, event_id, visitor, join=True):
+        """
+        Queues a visitor for an event, or reports on its place in the queue.
+
+        Args:
+            event_id (int): The id of the event the visitor wants to buy tickets for.
+            visitor (str): An opaque id of the visitor.
+            join (bool): Whether a visitor that isn't queued joins the queue, polling
+                only reports on visitors that already joined.
+
+        Returns:
+            dict: 'admitted' (bool), 'queued' (bool, false when the visitor isn't in
+            the queue and didn't join it), 'position' (int, visitors ahead in the
+            queue) and 'wait' (int, estimated seconds until admission).
+        """
+        if not self.enabled:
+            return {"admitted": True, "queued": True, "position": 0, "wait": 0}
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Take the write lock up front so concurrent workers queue in order
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT issued, credits, updated_at FROM gate WHERE event_id = ?",
+                (event_id,),
+            ).fetchone()
+            if row is None:
+                issued, credits, updated_at = 0, float(self.rate), now
+            else:
+                issued, credits, updated_at = row
+            credits = min(credits + (now - updated_at) * self.rate, float(self.rate))
+
+            # Drop expired admissions, and visitors that left the queue
+            conn.execute(
+                "DELETE FROM queue WHERE event_id = ? AND "
+                "(admitted_at < ? OR (admitted_at IS NULL AND seen_at < ?))",
+                (event_id, now - self.pass_ttl, now - self.idle_timeout),
+            )
+            row = conn.execute(
+                "SELECT position FROM queue WHERE event_id = ? AND visitor = ?",
+                (event_id, visitor),
+            ).fetchone()
+            if row is None and not join:
+                conn.execute("ROLLBACK")
+                return {"admitted": False, "queued": False, "position": 0, "wait": 0}
+            if row is None:
+                position = issued
+                issued += 1
+                conn.execute(
+                    "INSERT INTO queue (event_id, visitor, position, seen_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (event_id, visitor, position, now),
+                )
+            else:
+                position = row[0]
+                conn.execute(
+                    "UPDATE queue SET seen_at = ? WHERE event_id = ? AND visitor = ?",
+                    (now, event_id, visitor),
+                )
+
+            # Spend the credits on the head of the queue
+            if credits >= 1:
+                credits -= conn.execute(
+                    "UPDATE queue SET admitted_at = ? WHERE rowid IN ("
+                    "SELECT rowid FROM queue WHERE event_id = ? AND admitted_at IS NULL "
+                    "ORDER BY position LIMIT ?)",
+                    (now, event_id, int(credits)),
+                ).rowcount
+            admitted, ahead = conn.execute(
+                "SELECT (SELECT admitted_at IS NOT NULL FROM queue "
+                "WHERE event_id = ? AND visitor = ?), "
+                "(SELECT count(*) FROM queue "
+                "WHERE event_id = ? AND admitted_at IS NULL AND position < ?)",
+                (event_id, visitor, event_id, position),
+            ).fetchone()
+
+            conn.execute(
+                "INSERT OR REPLACE INTO gate (event_id, issued, credits, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (event_id, issued, credits, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        if admitted:
+            return {"admitted": True, "queued": True, "position": 0, "wait": 0}
+        return {
+            "admitted": False,
+            "queued": True,
+            "position": ahead,
+            "wait": int(math.ceil((ahead + 1 - credits) / self.rate)),
+        }
+
+
+def visitor_id():
+    """Returns the waiting room id of the current visitor, its user id."""
+    return current_user.get_id()
+
+
+def admission_required(view):
+    """
+    Decorator for views that take an event_id, lets the visitor through only once
+    the event's waiting room has admitted it and renders the waiting page otherwise.
+    It goes after login_required, only logged in visitors join the queue.
+    """
+
+    @wraps(view)
+    def wrapper(event_id, *args, **kwargs):
+        room = current_app.extensions["waiting_room"]
+        status = room.check(event_id, visitor_id())
+        if not status["admitted"]:
+            return (
+                render_template(
+                    "ticket/waiting_room.html",
+                    event_id=event_id,
+                    status=status,
+                    title="Waiting Room",
+                ),
+                200,
+                {"Retry-After": str(status["wait"])},
+            )
+        return view(event_id, *args, **kwargs)
+
+    return wrapper
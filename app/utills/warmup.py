@@ -0,0 +1,20 @@
+from PIL import Image
+from app.utills import ticket_render
+
+
+def warm_up(app):
+    """
+    Loads up front what web workers otherwise load lazily on their first requests:
+    the compiled templates, the URL map, and the PDF, QR code and imaging libraries
+    with their styles.
+
+    It is meant for a gunicorn master started with --preload, see gunicorn.conf.py,
+    so the workers forked from it share all of it and serve their first request at
+    full speed. It opens no database connection, sockets must not be shared across a
+    fork.
+    """
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    app.url_map.update()
+    Image.init()
+    ticket_render.get_styles()
@@ -1,10 +1,27 @@
-import os
-from flask import redirect, render_template, flash, url_for, Blueprint, abort, request
+from flask import (
+    redirect,
+    render_template,
+    flash,
+    url_for,
+    Blueprint,
+    abort,
+    request,
+    current_app,
+)
 from app.forms.event_forms import EventForm, CategoryForm
-from app.models.models import Event, Category, User, db
+from app.models.models import Event, User, db, organizers
 from flask_login import current_user, login_required
 from app.utills.utills import image_saver
+from app.utills.images import release_image
+from app.utills.pagination import keyset_paginate, offset_paginate
+from app.utills.search import search_events
+from app.utills.event_filters import EventFilters, facet_counts
+from app.utills.reference import categories
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
+from app.utills.page_cache import cached_page
+from app import page_cache
 
 event_bp = Blueprint("events", __name__)
 
@@ -17,14 +34,8 @@ def create_event():
         # Save image and get image name
         image_name = image_saver(form.image.data, folder="event_pics")
 
-        category_name = form.category.data
-        category = Category.query.filter_by(category_name=category_name).first()
-
-        if category is None:
-            # Populate the category table with a new category
-            category = Category(category_name=category_name)
-            db.session.add(category)
-            db.session.commit()
+        # Populate the category table with a new category, in the event's transaction
+        category_id = categories.get_or_create(form.category.data)
 
         event = Event(
             event_name=form.event_name.data,
@@ -38,10 +49,11 @@ def create_event():
             capacity=form.capacity.data,
             price=form.price.data,
             organizers=[current_user],
-            category_id=category.id,
+            category_id=category_id,
         )
         db.session.add(event)
         db.session.commit()
+        page_cache.invalidate("events")
 
         flash("Congratulations! Your event has been created", "success")
         return redirect(url_for("events.event_detail", event_id=event.id))
@@ -58,15 +70,24 @@ def add_category():
     """
     form = CategoryForm()
     if form.validate_on_submit():
-        category = Category(category_name=form.category_name.data)
-        db.session.add(category)
+        categories.get_or_create(form.category_name.data)
         db.session.commit()
         flash("Category added successfully.", "success")
         return redirect(url_for("events.create_event"))
     return render_template("event/add_category.html", form=form, title="Add Category")
 
 
+def _event_detail_tags(event_id):
+    # The page shows its organizer, so it is tagged like the event cards of the
+    # homepage, with the event and the users organizing it
+    user_ids = db.session.scalars(
+        select(organizers.c.user_id).where(organizers.c.event_id == event_id)
+    )
+    return [f"event:{event_id}"] + [f"user:{user_id}" for user_id in user_ids]
+
+
 @event_bp.route("/event/<int:event_id>")
+@cached_page(_event_detail_tags)
 def event_detail(event_id):
     """This function is responsible for displaying the details of a specific event.
     It accepts an event ID as a parameter and uses it to fetch and display the event's details.
@@ -91,22 +112,13 @@ def update_event(event_id):
     form = EventForm()
 
     if form.validate_on_submit():
-        # Get the category
-        category_name = form.category.data
-        category = Category.query.filter_by(category_name=category_name).first()
-
-        if category is None:
-            # Populate the category table with a new category
-            category = Category(category_name=category_name)
-            db.session.add(category)
-            db.session.commit()
+        # Get the category, or populate the category table with a new category
+        category_id = categories.get_or_create(form.category.data)
+        old_image = event.image
         new_image = form.image.data
         if new_image is None:
             new_image = event.image
         else:
-            if os.path.isfile(event.image):
-                os.remove(event.image)
-
             new_image = image_saver(new_image, folder="event_pics")
         event.image = new_image
         event.event_name = form.event_name.data
@@ -119,8 +131,11 @@ def update_event(event_id):
         event.capacity = form.capacity.data
         event.price = form.price.data
 
-        event.category_id = category.id
+        event.category_id = category_id
         db.session.commit()
+        page_cache.invalidate(f"event:{event.id}", "events")
+        if old_image != event.image:
+            release_image("event_pics", old_image)
         flash("Your event has been Updated!", "success")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
@@ -150,8 +165,11 @@ def delete_event(event_id):
     event = Event.query.get_or_404(event_id)
     if event.organizers[0].id != current_user.id:
         abort(403)
+    image = event.image
     db.session.delete(event)
     db.session.commit()
+    page_cache.invalidate(f"event:{event_id}", "events")
+    release_image("event_pics", image)
     flash("Your event has been deleted!", "success")
     return redirect(url_for("user.home"))
 
@@ -161,9 +179,47 @@ def delete_event(event_id):
 @login_required
 def list_events():
     """This function is responsible for listing all the events in the system.
-    It fetches all events from the database and displays them to the user."""
-    events = Event.query.all()
-    return render_template("event/event_list.html", events=events, title="Events List")
+    It fetches a page of events by start date from the database and displays them to the user.
+    The events can be filtered by category, date range, price band and availability, see
+    EventFilters, and with a search in the `q` and `location` query arguments, it lists the
+    matching events by relevance instead.
+    """
+    filters = EventFilters(request.args)
+    query = filters.apply(
+        Event.query.options(selectinload(Event.organizers), joinedload(Event.category))
+    )
+    facets = filters.facets(facet_counts())
+    text = request.args.get("q", "")
+    location = request.args.get("location", "")
+    search = search_events(query, text, location)
+    if search is not None:
+        events = offset_paginate(search, per_page=current_app.config["PER_PAGE"])
+        title = f'Events matching "{text.strip()}"' if text.strip() else "Events"
+        if location.strip():
+            title += f" in {location.strip()}"
+        return render_template(
+            "event/event_list.html",
+            events=events,
+            title=title,
+            search=True,
+            filters=filters,
+            facets=facets,
+        )
+
+    events = keyset_paginate(
+        query,
+        [Event.start_date, Event.id],
+        per_page=current_app.config["PER_PAGE"],
+        descending=False,
+    )
+    return render_template(
+        "event/event_list.html",
+        events=events,
+        title="Events List",
+        search=filters.active,
+        filters=filters,
+        facets=facets,
+    )
 
 
 @event_bp.route("/event/user/<string:username>")
@@ -176,10 +232,12 @@ def user_events(username):
     user = User.query.filter_by(username=username).first_or_404()
 
     # Query all events organized by the user
-    events = (
-        Event.query.filter(Event.organizers.contains(user))
-        .order_by(Event.created_at.desc())
-        .all()
+    events = keyset_paginate(
+        Event.query.filter(Event.organizers.contains(user)).options(
+            selectinload(Event.organizers), joinedload(Event.category)
+        ),
+        [Event.created_at, Event.id],
+        per_page=current_app.config["PER_PAGE"],
     )
 
     # Render the user's events page
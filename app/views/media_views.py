@@ -0,0 +1,32 @@
+import click
+from flask import Blueprint, abort, send_from_directory
+from app.utills.images import CONTENT_FILE, IMAGE_FOLDERS, collect_images, image_dir
+
+media_bp = Blueprint("media", __name__)
+
+# A content addressed file never changes, so browsers and CDNs can keep it for a year
+# without revalidating
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@media_bp.route("/media/<folder>/<path:filename>")
+def image(folder, filename):
+    """Serves an uploaded image or one of its variants, named after their content."""
+    if folder not in IMAGE_FOLDERS or not CONTENT_FILE.match(filename):
+        abort(404)
+
+    # The file name already identifies the content, use it as a strong ETag that is
+    # the same on every server
+    response = send_from_directory(
+        image_dir(folder), filename, etag=filename, max_age=IMMUTABLE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@media_bp.cli.command("gc")
+def gc_images():
+    """Remove uploaded images that are not referenced anymore."""
+    removed = collect_images()
+    click.echo(f"Removed {removed} unreferenced images")
@@ -1,7 +1,3 @@
-import os
-import qrcode
-import tempfile
-import pdfkit
 from flask import (
     redirect,
     render_template,
@@ -12,18 +8,36 @@ from flask import (
     send_file,
     current_app,
     abort,
+    jsonify,
+    Response,
+    stream_with_context,
 )
 from flask_login import current_user, login_required
-from app.models.models import Event, Ticket, TicketType, User, db
-from datetime import datetime
-from app.forms.ticket_forms import TicketPurchaseForm, TicketTypeForm
+from app.models.models import Event, Order, Ticket, TicketHold, TicketType, User, db
+from app.forms.ticket_forms import CheckoutForm, TicketPurchaseForm, TicketTypeForm
 from app.utills.utills import image_saver
+from app.utills.holds import (
+    cancel_hold,
+    confirm_hold,
+    create_hold,
+    release_expired_holds,
+)
+from app.utills.inventory import return_sold_tickets
+from app.utills.waiting_room import admission_required, visitor_id
+from app.utills.ticket_pdf import (
+    render_tickets_pdf,
+    ticket_pdf_data_for,
+    ticket_pdf_version,
+)
+from app.utills.ticket_export import stream_tickets_zip
+from app.utills.render_pool import get_render_pool
+from app.utills.render_jobs import job_status, parse_job_id, submit_render
+from app.utills.ticket_token import verify_ticket_token
+from app.utills.checkin import forget_ticket, get_checkin_index, is_organizer
+from app.utills.pagination import keyset_paginate
+from sqlalchemy.orm import joinedload
+from app import page_cache
 from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_JUSTIFY
-from reportlab.lib.units import inch
 
 
 ticket_bp = Blueprint("ticket", __name__)
@@ -31,6 +45,7 @@ ticket_bp = Blueprint("ticket", __name__)
 
 @ticket_bp.route("/event/<int:event_id>/purchase", methods=["GET", "POST"])
 @login_required
+@admission_required
 def purchase_ticket(event_id):
     event = Event.query.get_or_404(event_id)
 
@@ -44,12 +59,18 @@ def purchase_ticket(event_id):
         # Fetch ticket type from the database
         ticket_type = TicketType.query.get_or_404(form.ticket_type_id.data)
 
-        # check ticket type exists and if there are tickets available
-        if (
-            not ticket_type
-            and ticket_type.status != "available"
-            and ticket_type.quantity < form.quantity.data
-        ):
+        # Hold the tickets while the buyer checks out, this fails if the ticket
+        # type is not available or sold out, even when other buyers are racing for it
+        ttl = current_app.config["HOLD_TTL"]
+        hold = create_hold(current_user.id, ticket_type, form.quantity.data, ttl)
+        if hold is None:
+            # Expired holds may still be waiting for the reaper, release them and retry
+            if release_expired_holds(ticket_type_id=ticket_type.id):
+                hold = create_hold(
+                    current_user.id, ticket_type, form.quantity.data, ttl
+                )
+        if hold is None:
+            db.session.commit()
             flash(
                 "Purchase unsuccessful. The ticket type is not available or sold out ",
                 "danger",
@@ -61,47 +82,106 @@ def purchase_ticket(event_id):
                 event=event,
             )
 
+        # Save changes to database
+        db.session.commit()
+
+        return redirect(url_for("ticket.checkout", hold_id=hold.id))
+    return render_template(
+        "ticket/purchase_ticket.html", form=form, event=event, title="Purchase Ticket"
+    )
+
+
+@ticket_bp.route("/event/<int:event_id>/queue", methods=["GET"])
+@login_required
+def queue_status(event_id):
+    # Report the visitor's place in the event's waiting room, this is polled by
+    # the waiting page and never joins the queue, only the purchase page does
+    status = current_app.extensions["waiting_room"].check(
+        event_id, visitor_id(), join=False
+    )
+    if status["admitted"] or not status["queued"]:
+        # Visitors dropped from the queue join it again from the purchase page
+        status["next"] = url_for("ticket.purchase_ticket", event_id=event_id)
+    return jsonify(status)
+
+
+@ticket_bp.route("/checkout/<int:hold_id>", methods=["GET", "POST"])
+@login_required
+def checkout(hold_id):
+    # Retrieve the hold
+    hold = TicketHold.query.get_or_404(hold_id)
+
+    # Validate that the current user is the owner of the hold
+    if current_user.id != hold.user_id:
+        flash(
+            "You do not have the necessary permissions to perform this action!",
+            "danger",
+        )
+        return redirect(url_for("user.home"))
+
+    event_id = hold.ticket_type.event_id
+    form = CheckoutForm()
+
+    if form.validate_on_submit():
+        if form.cancel.data:
+            cancel_hold(hold)
+            db.session.commit()
+            flash("Your tickets have been released.", "info")
+            return redirect(url_for("events.event_detail", event_id=event_id))
+
         #  check if user has enough balance to purchase the ticket
-        user = User.query.get(current_user.id)
-        total_amount = ticket_type.price * form.quantity.data
+        total_amount = hold.ticket_type.price * hold.quantity
         balance = 1000
         if balance < total_amount:
             flash("Purchase unsuccessful. Insufficient funds ")
             return render_template(
-                "ticket/purchase_ticket.html",
-                title="Purchase Ticket",
-                form=form,
-                event=event,
+                "ticket/checkout.html", form=form, hold=hold, title="Checkout"
             )
 
-        # Create and store tickets in the database
-        for _ in range(form.quantity.data):
-            new_ticket = Ticket(
-                user_id=current_user.id,
-                ticket_type_id=ticket_type.id,
-                purchase_date=datetime.utcnow(),
-                use_status="unused",
+        # Turn the hold into an order and its tickets
+        quantity = hold.quantity
+        order = confirm_hold(hold)
+        if order is None:
+            db.session.rollback()
+            flash(
+                "Purchase unsuccessful. Your tickets hold has expired, please try again.",
+                "danger",
             )
-            db.session.add(new_ticket)
-
-        # Decrease the ticket type quantity
-        ticket_type.quantity -= form.quantity.data
-        if ticket_type.quantity == 0:
-            ticket_type.status = "sold"
-
-        # deduct user balance
-        balance -= total_amount
+            return redirect(url_for("ticket.purchase_ticket", event_id=event_id))
 
         # Save changes to database
         db.session.commit()
 
         flash(
-            f"Ticket purchase successful! {form.quantity.data} tickets bought. ticket_id: {new_ticket.id}",
+            f"Ticket purchase successful! {quantity} tickets bought. order_id: {order.id}",
             "success",
         )
-        return redirect(url_for("ticket.download_ticket", ticket_id=new_ticket.id))
+        return redirect(url_for("ticket.order_detail", order_id=order.id))
+
     return render_template(
-        "ticket/purchase_ticket.html", form=form, event=event, title="Purchase Ticket"
+        "ticket/checkout.html", form=form, hold=hold, title="Checkout"
+    )
+
+
+@ticket_bp.route("/order/<int:order_id>", methods=["GET"])
+@login_required
+def order_detail(order_id):
+    # Retrieve the order
+    order = Order.query.get_or_404(order_id)
+
+    # Validate that the current user is the owner of the order
+    if current_user.id != order.user_id:
+        flash(
+            "You do not have the necessary permissions to perform this action!",
+            "danger",
+        )
+        return redirect(url_for("user.home"))
+
+    return render_template(
+        "ticket/order_detail.html",
+        order=order,
+        tickets=order.tickets.order_by(Ticket.id),
+        title=f"Order #{order.id}",
     )
 
 
@@ -119,107 +199,145 @@ def download_ticket(ticket_id):
         )
         return redirect(url_for("user.home"))
 
-    # Create a QR Code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(
-        f"Ticket ID: {ticket.id}\nUser ID: {current_user.id}\nEvent ID: {ticket.ticket_type.event.id}\nTicket Type ID: {ticket.ticket_type.id}\nPurchase Date/Time: {ticket.purchase_date}\nTicket Status: {ticket.use_status}"
-    )
-    qr_code_image = qr.make_image(fill="black", back_color="white")
-
-    # Convert QR Code image to PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-
-    # Fetch the built-in styles
-    styles = getSampleStyleSheet()
-
-    # Build the PDF Elements
-    elements = []
-    if ticket.ticket_type.image is not None:
-        # Add company logo
-        logo_path = os.path.join(
-            current_app.root_path,
-            "static",
-            "img",
-            "ticket_pics",
-            ticket.ticket_type.image,
-        )
-    else:
-        # Add company logo
-        logo_path = os.path.join(
-            current_app.root_path,
-            "static",
-            "img",
-            "event_pics",
-            ticket.ticket_type.event.image,
+    # Serve the cached PDF when this version of the ticket was already rendered
+    pdf_cache = current_app.extensions["pdf_cache"]
+    data = ticket_pdf_data_for(ticket)
+    version = ticket_pdf_version(data)
+    path = pdf_cache.get(ticket.id, version)
+    if path is not None:
+        return send_file(
+            path,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name="ticket.pdf",
         )
 
-    logo = Image(logo_path, width=4 * inch, height=3 * inch)
-    elements.append(logo)
-    elements.append(Spacer(1, 0.25 * inch))
-
-    styles = getSampleStyleSheet()
-    # Add a Justified style
-    styles.add(
-        ParagraphStyle(
-            name="Justify",
-            parent=styles["Normal"],
-            alignment=TA_JUSTIFY,
-            leftIndent=85,
-            rightIndent=15,
+    # Render in the background pool, the client polls the job and is sent back here
+    # for the cached file once it is done
+    if current_app.config["RENDER_ASYNC"] and pdf_cache.enabled:
+        job_id = submit_render(
+            get_render_pool(),
+            pdf_cache,
+            data,
+            version,
+            current_app.config["RENDER_QUEUE_DEPTH"],
         )
-    )
-    # Add Ticket Information
-    elements.append(Paragraph(f"User: {current_user.username}", styles["Justify"]))
-    elements.append(
-        Paragraph(
-            f"Event Name: {ticket.ticket_type.event.event_name}", styles["Justify"]
+        status = 202 if job_id is not None else 503
+        return (
+            render_template(
+                "ticket/render_job.html",
+                ticket=ticket,
+                job_id=job_id,
+                title="Preparing your ticket",
+            ),
+            status,
+            {"Retry-After": "2"},
         )
+
+    pdf = render_tickets_pdf([data])
+    pdf_cache.put(ticket.id, version, pdf)
+
+    # Return the PDF file
+    return send_file(
+        BytesIO(pdf),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name="ticket.pdf",
     )
-    elements.append(
-        Paragraph(f"Event ID: {ticket.ticket_type.event.id}", styles["Justify"])
-    )
-    elements.append(
-        Paragraph(f"Ticket Type ID: {ticket.ticket_type.id}", styles["Justify"])
+
+
+@ticket_bp.route("/render_jobs/<string:job_id>", methods=["GET"])
+@login_required
+def render_job_status(job_id):
+    job = parse_job_id(job_id)
+    if job is None:
+        abort(404)
+
+    # Validate that the current user is the owner of the ticket
+    ticket_id, _ = job
+    owner_id = db.session.query(Ticket.user_id).filter_by(id=ticket_id).scalar()
+    if owner_id is None:
+        abort(404)
+    if owner_id != current_user.id:
+        abort(403)
+
+    status = job_status(current_app.extensions["pdf_cache"], job_id)
+    return jsonify(
+        {
+            "job_id": job_id,
+            "status": status,
+            "url": url_for("ticket.download_ticket", ticket_id=ticket_id),
+        }
     )
-    elements.append(
-        Paragraph(
-            f"Purchase Date/Time: {ticket.purchase_date.strftime('%B %d, %Y, %I:%M %p')}",
-            styles["Justify"],
+
+
+@ticket_bp.route("/event/<int:event_id>/tickets/export", methods=["GET"])
+@login_required
+def export_tickets(event_id):
+    event = Event.query.get_or_404(event_id)
+
+    # Only the organizers of the event can export its tickets
+    if current_user not in event.organizers:
+        flash(
+            "You do not have the necessary permissions to perform this action!",
+            "danger",
         )
+        return redirect(url_for("user.home"))
+
+    # Optionally export a single ticket type, and one PDF per ticket
+    ticket_type_id = request.args.get("ticket_type_id", type=int)
+    if request.args.get("split", type=int):
+        batch_size = 1
+    else:
+        batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+
+    stream = stream_tickets_zip(
+        get_render_pool(),
+        event.id,
+        ticket_type_id,
+        batch_size=batch_size,
+        window=current_app.config["RENDER_WORKERS"] * 2,
     )
-    elements.append(
-        Paragraph(
-            f"Ticket Price: ${ticket.ticket_type.price}",
-            styles["Justify"],
-        )
+    return Response(
+        stream_with_context(stream),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=event-{event.id}-tickets.zip"
+        },
     )
-    elements.append(Paragraph(f"Ticket Status: {ticket.use_status}", styles["Justify"]))
-    # save the qr_code_image to a temperary file
-    fp = tempfile.TemporaryFile(suffix=".png")
-    qr_code_image.save(fp, "PNG")
-    fp.seek(0)
 
-    # Add QR code image
-    img = Image(fp, width=2 * inch, height=2 * inch)
-    elements.append(img)
 
-    # Generate PDF
-    doc.build(elements)
+@ticket_bp.route("/event/<int:event_id>/checkin", methods=["GET", "POST"])
+@login_required
+def checkin(event_id):
+    # Only the organizers of the event can check tickets in, checked before the index
+    # of the event is loaded or cached for anyone
+    if not is_organizer(event_id, current_user.id):
+        abort(403)
+    index = get_checkin_index(event_id, current_app.config["CHECKIN_INDEX_TTL"])
+
+    if request.method == "GET":
+        event = Event.query.get_or_404(event_id)
+        return render_template(
+            "ticket/checkin.html", event=event, title=f"{event.event_name} Check-in"
+        )
 
-    # Return the PDF file
-    buffer.seek(0)
-    return send_file(
-        buffer,
-        mimetype="application/pdf",
-        as_attachment=True,
-        download_name="ticket.pdf",
+    payload = request.get_json(silent=True) or request.form
+    token = verify_ticket_token(
+        current_app.config["SECRET_KEY"], payload.get("token", "")
     )
+    if token is None:
+        result, status = "invalid", 400
+    elif token.event_id != event_id:
+        result, status = "wrong_event", 400
+    else:
+        result = index.check_in(token)
+        status = {"admitted": 200, "duplicate": 409}.get(result, 400)
+
+    response = {"result": result, **index.counts()}
+    if token is not None:
+        response["ticket_id"] = token.ticket_id
+    return jsonify(response), status
 
 
 @ticket_bp.route("/events/<int:event_id>/ticket_type/new", methods=["GET", "POST"])
@@ -263,6 +381,7 @@ def new_ticket_type(event_id):
             )
             db.session.add(ticket_type)
             db.session.commit()
+            page_cache.invalidate(f"event:{event.id}")
             flash("The ticket type has been created!", "success")
             return redirect(
                 url_for("ticket.ticket_type_detail", ticket_id=ticket_type.id)
@@ -350,7 +469,12 @@ def ticket_type_detail(ticket_type_id):
 @login_required
 def get_user_tickets(user_id):
     user = User.query.get_or_404(user_id)
-    tickets = user.tickets
+    # Load the ticket type and event every row shows with the tickets
+    tickets = (
+        Ticket.query.filter_by(user_id=user.id)
+        .options(joinedload(Ticket.ticket_type).joinedload(TicketType.event))
+        .order_by(Ticket.id)
+    )
     return render_template(
         "ticket/user_tickets.html", tickets=tickets, title=f"{user.username}'s Tickets"
     )
@@ -362,8 +486,13 @@ def delete_ticket(ticket_id):
     ticket = Ticket.query.get_or_404(ticket_id)
     if ticket.user_id != current_user.id:
         abort(401)  # Unauthorized
+    # The delete is flushed first, so a concurrent delete of the same ticket fails
+    # before its unit is returned twice
     db.session.delete(ticket)
+    db.session.flush()
+    return_sold_tickets(ticket.ticket_type_id, 1)
     db.session.commit()
+    forget_ticket(ticket_id)
     flash("Your ticket has been deleted successfully!", "success")
     return redirect(url_for("ticket.get_user_tickets", user_id=ticket.user_id))
 
@@ -371,5 +500,10 @@ def delete_ticket(ticket_id):
 @ticket_bp.route("/tickets")
 @login_required
 def tickets():
-    tickets = TicketType.query.all()
+    # Ticket types have no creation date, their ids are in creation order
+    tickets = keyset_paginate(
+        TicketType.query.options(joinedload(TicketType.event)),
+        [TicketType.id],
+        per_page=current_app.config["PER_PAGE"],
+    )
     return render_template("ticket/ticket_list.html", tickets=tickets, title="Tickets")
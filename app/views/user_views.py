@@ -6,6 +6,7 @@ from flask import (
     session,
     request,
     Blueprint,
+    current_app,
 )
 from app.forms.user_forms import (
     SignupForm,
@@ -15,11 +16,16 @@ from app.forms.user_forms import (
     ContactForm,
 )
 from app.forms.event_forms import EventForm
-from app.models.models import User, Event, Testimonial, Ticket, Contact
+from app.models.models import User, Event, Testimonial, Contact
 from flask_login import login_user, logout_user, current_user, login_required
-from app import db
+from app import db, page_cache
 from werkzeug.urls import url_parse
 from app.utills.utills import image_saver, process_contact_form
+from app.utills.images import image_url, release_image
+from app.utills.pagination import keyset_paginate
+from app.utills.reference import categories
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 
 
 user_bp = Blueprint("user", __name__)
@@ -32,15 +38,23 @@ def contact_api():
     return process_contact_form(contact_form)
 
 
+def _testimonial_tags():
+    # The carousel shows the name and picture of every author
+    author_ids = db.session.scalars(select(Testimonial.author_id).distinct())
+    return ["testimonials"] + [f"user:{author_id}" for author_id in author_ids]
+
+
 @user_bp.route("/", methods=["GET", "POST"])
 def homepage():
     contact_form = ContactForm()
-    page = request.args.get("page", 1, type=int)
-    events = Event.query.order_by(Event.created_at.desc()).paginate(
-        page=page, per_page=6
+    # Load what the event cards and testimonials show up front, one query per relation
+    events = keyset_paginate(
+        Event.query.options(selectinload(Event.organizers), joinedload(Event.category)),
+        [Event.created_at, Event.id],
+        per_page=6,
     )
-    testimonials = Testimonial.query.all()
-    tickets = Ticket.query.all()
+    # Only run when the testimonial carousel is not cached
+    testimonials = Testimonial.query.options(selectinload(Testimonial.author))
 
     contact_form = ContactForm()
     if contact_form.validate_on_submit():
@@ -62,7 +76,8 @@ def homepage():
         events=events,
         contact_form=contact_form,
         testimonials=testimonials,
-        tickets=tickets,
+        testimonial_tags=_testimonial_tags,
+        categories=categories.names(),
         title="Landing page",
     )
 
@@ -120,7 +135,11 @@ def logout():
 @user_bp.route("/home", methods=["GET", "POST"])
 @login_required
 def home():
-    events = Event.query.all()
+    events = keyset_paginate(
+        Event.query.options(selectinload(Event.organizers), joinedload(Event.category)),
+        [Event.created_at, Event.id],
+        per_page=current_app.config["PER_PAGE"],
+    )
     return render_template("user/home.html", title="User Home", events=events)
 
 
@@ -138,6 +157,8 @@ def profile():
 def account_update():
     form = UpdateAccountForm()
     if form.validate_on_submit():
+        old_profile_pic = current_user.profile_pic
+        old_company_logo = current_user.company_logo
         if form.profile_pic.data:
             profile_image = image_saver(form.profile_pic.data, folder="profile_pics")
         else:
@@ -154,6 +175,11 @@ def account_update():
         current_user.phone_number = form.phone_number.data
         current_user.company_name = form.company_name.data
         db.session.commit()
+        if old_profile_pic != current_user.profile_pic:
+            release_image("profile_pics", old_profile_pic)
+        if old_company_logo != current_user.company_logo:
+            release_image("company_logos", old_company_logo)
+        page_cache.invalidate(f"user:{current_user.id}")
         flash("Your account info has been updated successfully", "success")
         return redirect(url_for("user.profile"))
     if request.method == "GET":
@@ -164,12 +190,12 @@ def account_update():
         form.phone_number.data = current_user.phone_number
         form.company_name.data = current_user.company_name
     profile_pic = (
-        url_for("static", filename="img/profile_pics/" + current_user.profile_pic)
+        image_url("profile_pics", current_user.profile_pic, "card")
         if current_user.profile_pic
         else None
     )
     company_logo = (
-        url_for("static", filename="img/company_logos/" + current_user.company_logo)
+        image_url("company_logos", current_user.company_logo, "card")
         if current_user.company_logo
         else None
     )
@@ -194,6 +220,7 @@ def add_testimonial():
         )
         db.session.add(testimonial)
         db.session.commit()
+        page_cache.invalidate("testimonials")
         flash("Your testimony has been added successfuly!", "success")
         return redirect(url_for("user.home"))
     return render_template(
@@ -0,0 +1,365 @@
+"""
+Benchmarks of the main request paths against a large synthetic dataset.
+
+Seeds a database with a dataset of the requested size, then times requests to each
+benchmarked view through the Flask test client and reports the latency percentiles and
+the number of queries of each, as JSON. With --baseline, the results are compared to a
+saved run and the exit status is 1 if any view got slower or runs more queries.
+
+    python -m benchmarks.bench --output baseline.json
+    python -m benchmarks.bench --baseline baseline.json
+
+The dataset is kept in the database between runs and only seeded when it is empty, a
+dataset at production scale takes a while to seed:
+
+    python -m benchmarks.bench --users 100000 --events 100000 \\
+        --ticket-types 1000000 --tickets 10000000
+
+Any database SQLAlchemy supports works, e.g. a local PostgreSQL with
+--database-url postgresql://localhost/moristickets_bench. The page, PDF and waiting
+room stores are created empty in a temporary folder for every run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from config import Config
+from app import create_app
+from app.models.models import Event, Ticket, TicketType, User, db
+from app.utills.event_filters import PRICE_BANDS
+from app.utills.pagination import encode_cursor
+from app.utills.query_count import count_queries
+from benchmarks import dataset
+
+DEFAULT_DATABASE = os.path.join(Config.BASE_DIR, "instance", "bench.db")
+# The user the logged in requests are made as
+BENCH_USER = 1
+
+
+def bench_config(database_url, workdir, cache=True):
+    """
+    Returns the app configuration of a benchmark run on `database_url`, with the local
+    stores in `workdir`.
+    """
+
+    class BenchConfig(Config):
+        SECRET_KEY = Config.SECRET_KEY or "bench"
+        SQLALCHEMY_DATABASE_URI = database_url
+        WTF_CSRF_ENABLED = False
+        # Measure the views, not the admission and hold machinery around them
+        WAITING_ROOM_RATE = 0
+        WAITING_ROOM_DB = os.path.join(workdir, "waiting_room.db")
+        HOLD_REAPER_INTERVAL = 0
+        RENDER_ASYNC = False
+        PAGE_CACHE_TTL = Config.PAGE_CACHE_TTL if cache else 0
+        PAGE_CACHE_DB = os.path.join(workdir, "page_cache.db")
+        PDF_CACHE_MAX_BYTES = Config.PDF_CACHE_MAX_BYTES if cache else 0
+        PDF_CACHE_DIR = os.path.join(workdir, "pdf_cache")
+        METRICS_DIR = os.path.join(workdir, "metrics")
+
+    return BenchConfig
+
+
+def percentile(values, percent):
+    """Returns the nearest rank percentile of sorted values."""
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[rank]
+
+
+class Case(object):
+    """
+    A benchmarked request. `make_request` takes a random generator and returns the
+    method, URL and form data of the next request.
+    """
+
+    def __init__(self, name, make_request, logged_in=True, statuses=(200,)):
+        self.name = name
+        self.make_request = make_request
+        self.logged_in = logged_in
+        self.statuses = statuses
+
+
+def make_cases(sizes):
+    """Returns the benchmarked requests for a dataset of the given sizes."""
+    events, ticket_types = sizes["events"], sizes["ticket_types"]
+    owned = db.session.scalars(
+        select(Ticket.id).where(Ticket.user_id == BENCH_USER).limit(1000)
+    ).all()
+
+    def deep_listing(rng):
+        # A page in the middle of the listing, reached through its cursor
+        event = db.session.get(Event, rng.randint(1, events))
+        cursor = encode_cursor([event.start_date, event.id])
+        return "GET", f"/events?after={cursor}", None
+
+    def filtered_listing(rng):
+        category = rng.choice(dataset.CATEGORIES)
+        band = rng.choice(PRICE_BANDS)[0]
+        return "GET", f"/events?category={category}&price={band}&available=1", None
+
+    def search(rng):
+        # Two words of the dataset's vocabulary, most events mention at least one
+        return "GET", f"/events?q={'+'.join(rng.sample(dataset.WORDS, 2))}", None
+
+    def purchase(rng):
+        # Ticket types are spread over the events in turn, see dataset.seed
+        ticket_type_id = rng.randint(1, ticket_types)
+        event_id = (ticket_type_id - 1) % events + 1
+        data = {"ticket_type_id": ticket_type_id, "quantity": 1}
+        return "POST", f"/event/{event_id}/purchase", data
+
+    cases = [
+        Case("homepage", lambda rng: ("GET", "/", None)),
+        Case("list_events", lambda rng: ("GET", "/events", None)),
+        Case("list_events_deep", deep_listing),
+        Case("list_events_filtered", filtered_listing),
+        Case("search_events", search),
+        Case(
+            "event_detail",
+            lambda rng: ("GET", f"/event/{rng.randint(1, events)}", None),
+        ),
+        Case(
+            "event_detail_anonymous",
+            lambda rng: ("GET", f"/event/{rng.randint(1, events)}", None),
+            logged_in=False,
+        ),
+        Case(
+            "get_user_tickets",
+            lambda rng: ("GET", f"/users/{BENCH_USER}/tickets", None),
+        ),
+        Case("purchase_ticket", purchase, statuses=(302,)),
+    ]
+    if owned:
+        cases.insert(
+            -1,
+            Case(
+                "download_ticket",
+                lambda rng: ("GET", f"/download_ticket/{rng.choice(owned)}", None),
+            ),
+        )
+    return cases
+
+
+def run_case(app, client, case, iterations, warmup, rng):
+    """Times `iterations` requests of a case, after `warmup` untimed ones."""
+    with app.app_context():
+        engine = db.engine
+    durations, queries, errors = [], [], 0
+    for i in range(warmup + iterations):
+        with app.app_context():
+            method, url, data = case.make_request(rng)
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            # Streamed responses, like files, are only produced when read
+            response.get_data()
+            duration = time.perf_counter() - start
+        response.close()
+        if i < warmup:
+            continue
+        if response.status_code not in case.statuses:
+            errors += 1
+        durations.append(duration * 1000)
+        queries.append(counter.count)
+
+    durations.sort()
+    return {
+        "requests": iterations,
+        "errors": errors,
+        "mean_ms": round(sum(durations) / len(durations), 3),
+        "p50_ms": round(percentile(durations, 50), 3),
+        "p95_ms": round(percentile(durations, 95), 3),
+        "p99_ms": round(percentile(durations, 99), 3),
+        "max_ms": round(durations[-1], 3),
+        "queries": round(sum(queries) / len(queries), 2),
+    }
+
+
+def compare(results, baseline, metric, threshold):
+    """
+    Compares results to a baseline run.
+
+    Returns:
+        list: One line per view that got slower by more than `threshold`, as a
+            fraction of its baseline `metric`, or that runs more queries.
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+        line = (
+            f"{name}: {metric} {before[metric]:.2f} -> {result[metric]:.2f} ms "
+            f"({change:+.0%}), queries {before['queries']} -> {result['queries']}"
+        )
+        print(line, file=sys.stderr)
+        if change > threshold or result["queries"] > before["queries"]:
+            regressions.append(line)
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Config.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + DEFAULT_DATABASE,
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--ticket-types", type=int, default=10000)
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--reseed", action="store_true", help="drop the dataset and seed it again"
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="+", metavar="NAME", help="only run these benchmarks"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="disable the page and PDF caches, to time the uncached paths",
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare to the results of a previous run")
+    parser.add_argument("--metric", default="p50_ms", help="compared metric")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slow down, as a fraction, reported as a regression",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = {
+        "users": args.users,
+        "events": args.events,
+        "ticket_types": args.ticket_types,
+        "tickets": args.tickets,
+    }
+    workdir = tempfile.mkdtemp(prefix="moristickets-bench-")
+
+    if args.database_url == "sqlite:///" + DEFAULT_DATABASE:
+        os.makedirs(os.path.dirname(DEFAULT_DATABASE), exist_ok=True)
+    try:
+        app = create_app(bench_config(args.database_url, workdir, not args.no_cache))
+        with app.app_context():
+            if args.reseed:
+                db.drop_all()
+            # The benchmark database is built straight from the models
+            db.create_all()
+            if not dataset.is_seeded():
+                print(f"Seeding {sizes}...", file=sys.stderr)
+                start = time.perf_counter()
+                dataset.seed(seed=args.seed, **sizes)
+                print(f"Seeded in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            else:
+                found = {
+                    "users": db.session.scalar(select(func.count(User.id))),
+                    "events": db.session.scalar(select(func.count(Event.id))),
+                    "ticket_types": db.session.scalar(
+                        select(func.count(TicketType.id))
+                    ),
+                    "tickets": db.session.scalar(select(func.count(Ticket.id))),
+                }
+                if found != sizes:
+                    sys.exit(
+                        f"The database holds another dataset {found}, "
+                        "pass --reseed to replace it"
+                    )
+            database = db.engine.dialect.name
+            cases = make_cases(sizes)
+            if args.only:
+                cases = [case for case in cases if case.name in args.only]
+
+        rng = random.Random(args.seed)
+        anonymous = app.test_client()
+        client = app.test_client()
+        response = client.post(
+            "/login",
+            data={
+                "email": dataset.bench_email(BENCH_USER),
+                "password": dataset.PASSWORD,
+            },
+        )
+        if response.status_code != 302:
+            sys.exit("Logging in the benchmark user failed")
+
+        results = {
+            "meta": {
+                "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "database": database,
+                "dataset": sizes,
+                "iterations": args.iterations,
+                "warmup": args.warmup,
+                "cache": not args.no_cache,
+            },
+            "results": {},
+        }
+        for case in cases:
+            result = run_case(
+                app,
+                client if case.logged_in else anonymous,
+                case,
+                args.iterations,
+                args.warmup,
+                rng,
+            )
+            results["results"][case.name] = result
+            print(
+                f"{case.name:24} p50 {result['p50_ms']:9.2f} ms"
+                f"  p99 {result['p99_ms']:9.2f} ms"
+                f"  {result['queries']:6} queries  {result['errors']} errors",
+                file=sys.stderr,
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline, args.metric, args.threshold)
+        if regressions:
+            print("Regressions:\n" + "\n".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import random
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, insert, select, update
+from werkzeug.security import generate_password_hash
+from app.models.models import (
+    Category,
+    Event,
+    Testimonial,
+    Ticket,
+    TicketType,
+    User,
+    db,
+    organizers,
+)
+
+# Every synthetic user logs in with this password
+PASSWORD = "bench"
+CATEGORIES = (
+    "Music",
+    "Sports",
+    "Theatre",
+    "Comedy",
+    "Conference",
+    "Festival",
+    "Workshop",
+    "Exhibition",
+    "Film",
+    "Food & Drink",
+    "Charity",
+    "Nightlife",
+)
+WORDS = (
+    "summer open live night city grand annual spring winter jazz rock tech "
+    "startup football marathon art design food wine craft beer comedy folk"
+).split()
+# Rows sent to the database per INSERT
+CHUNK_SIZE = 10000
+
+
+def bench_email(user_id):
+    return f"user{user_id}@example.com"
+
+
+def _insert(table, rows):
+    # Core bulk inserts, the ORM unit of work is far too slow for millions of rows
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(insert(table), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(table), chunk)
+
+
+def is_seeded():
+    """Returns True if the database already holds a dataset."""
+    return bool(db.session.scalar(select(func.count()).select_from(Event)))
+
+
+def seed(users, events, ticket_types, tickets, seed=0):
+    """
+    Fills an empty database with a synthetic dataset of the given size.
+
+    Row ids start at 1 and are dense, so the benchmarks can pick random rows without
+    querying. Every event gets one organizer and starts within the next year, ticket
+    types are spread evenly over the events and tickets randomly over the ticket types
+    and users, with matching sold counters. Ticket types have plenty of tickets left,
+    so purchases never sell out.
+
+    Args:
+        users (int): The number of users, all with the password PASSWORD.
+        events (int): The number of events.
+        ticket_types (int): The number of ticket types.
+        tickets (int): The number of sold tickets.
+        seed (int): Seed of the random generator, the same seed gives the same data.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    today = date.today()
+
+    if db.engine.dialect.name == "sqlite":
+        # The dataset is rebuilt from scratch if seeding is interrupted
+        db.session.execute(db.text("PRAGMA synchronous = OFF"))
+
+    # Hashing is slow on purpose, every user shares the same hash
+    password_hash = generate_password_hash(PASSWORD)
+    _insert(
+        User.__table__,
+        (
+            {
+                "id": i,
+                "username": f"user{i}",
+                "email": bench_email(i),
+                "password_hash": password_hash,
+                "balance": 1000.0,
+            }
+            for i in range(1, users + 1)
+        ),
+    )
+    _insert(
+        Category.__table__,
+        ({"id": i, "category_name": name} for i, name in enumerate(CATEGORIES, 1)),
+    )
+    _insert(
+        Event.__table__,
+        (
+            {
+                "id": i,
+                "event_name": " ".join(rng.sample(WORDS, 3)).title(),
+                "description": " ".join(rng.choices(WORDS, k=60)),
+                "created_at": now - timedelta(minutes=events - i),
+                "start_date": today + timedelta(days=1 + i % 365),
+                "end_date": today + timedelta(days=2 + i % 365),
+                "start_time": time(18),
+                "end_time": time(23),
+                "venue": f"Venue {rng.randint(1, 500)}",
+                "capacity": 1000,
+                "price": float(rng.randint(5, 200)),
+                "category_id": rng.randint(1, len(CATEGORIES)),
+            }
+            for i in range(1, events + 1)
+        ),
+    )
+    _insert(
+        organizers,
+        (
+            {"event_id": i, "user_id": rng.randint(1, users)}
+            for i in range(1, events + 1)
+        ),
+    )
+    _insert(
+        TicketType.__table__,
+        (
+            {
+                "id": i,
+                "ticket_name": f"Tier {i}",
+                "ticket_type": rng.choice(("Ordinary", "VIP", "Early bird")),
+                "price": float(rng.randint(5, 200)),
+                "quantity": 1000000,
+                "status": "available",
+                "event_id": (i - 1) % events + 1,
+            }
+            for i in range(1, ticket_types + 1)
+        ),
+    )
+    _insert(
+        Ticket.__table__,
+        (
+            {
+                "id": i,
+                "user_id": rng.randint(1, users),
+                "ticket_type_id": rng.randint(1, ticket_types),
+                "purchase_date": now - timedelta(seconds=rng.randint(0, 86400 * 90)),
+                "use_status": "unused",
+            }
+            for i in range(1, tickets + 1)
+        ),
+    )
+    # Keep the sold counters in line with the tickets
+    sold = (
+        select(Ticket.ticket_type_id, func.count().label("sold"))
+        .group_by(Ticket.ticket_type_id)
+        .subquery()
+    )
+    db.session.execute(
+        update(TicketType)
+        .where(TicketType.id == sold.c.ticket_type_id)
+        .values(sold=sold.c.sold)
+    )
+    _insert(
+        Testimonial.__table__,
+        (
+            {
+                "testimony": " ".join(rng.choices(WORDS, k=30)),
+                "author_id": rng.randint(1, users),
+                "author_role": "Attendee",
+            }
+            for _ in range(min(users, 20))
+        ),
+    )
+    if db.engine.dialect.name == "postgresql":
+        # The ids were given explicitly, move the sequences past them
+        for table in (User, Category, Event, TicketType, Ticket):
+            name = table.__table__.name
+            db.session.execute(
+                db.text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+                    f'(SELECT max(id) FROM "{name}"))'
+                )
+            )
+    db.session.commit()
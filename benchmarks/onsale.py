@@ -0,0 +1,295 @@
+"""
+Load simulation of a ticket on-sale, which checks that no ticket is ever oversold.
+
+Hundreds of simulated buyers, spread over threads in several processes, all rush the
+same ticket type at once on a file backed database. Each buyer holds tickets through
+purchase_ticket and then confirms the hold at checkout. The run reports the throughput,
+the latency percentiles of both steps and the outcome of every attempt as JSON, then
+checks the stock invariants from the database. The exit status is 1 if an invariant
+is broken or, with --max-error-rate, if too many attempts failed.
+
+    python -m benchmarks.onsale --processes 4 --threads 50 --quantity 100
+
+The database is recreated on every run, --database-url points it at a local
+PostgreSQL instead of the default SQLite file.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select, update
+from config import Config
+from app import create_app
+from app.models.models import Order, Ticket, TicketType, db
+from benchmarks import dataset
+from benchmarks.bench import bench_config, git_revision, percentile
+
+DEFAULT_DATABASE = os.path.join(Config.BASE_DIR, "instance", "onsale.db")
+# Seconds to wait for every buyer to be ready before giving up
+READY_TIMEOUT = 300
+# The only event and ticket type of the dataset
+EVENT_ID = TICKET_TYPE_ID = 1
+
+
+def attempt_purchase(client, quantity):
+    """
+    Runs one purchase attempt of a buyer, holding the tickets and checking out.
+
+    Returns:
+        tuple: The outcome, one of 'bought', 'sold_out', 'expired' or 'error', and the
+            hold and checkout durations in milliseconds, None for a step not reached.
+    """
+    start = time.perf_counter()
+    response = client.post(
+        f"/event/{EVENT_ID}/purchase",
+        data={"ticket_type_id": TICKET_TYPE_ID, "quantity": quantity},
+    )
+    hold_ms = (time.perf_counter() - start) * 1000
+    if response.status_code == 200:
+        # The purchase page is shown again with the sold out message
+        return "sold_out", hold_ms, None
+    if response.status_code != 302 or "/checkout/" not in response.location:
+        return "error", hold_ms, None
+
+    start = time.perf_counter()
+    response = client.post(response.location, data={"confirm": "Confirm and Pay"})
+    checkout_ms = (time.perf_counter() - start) * 1000
+    if response.status_code != 302:
+        return "error", hold_ms, checkout_ms
+    if "/order/" not in response.location:
+        return "expired", hold_ms, checkout_ms
+    return "bought", hold_ms, checkout_ms
+
+
+def buyer_process(database_url, workdir, user_ids, quantity, attempts, barrier, queue):
+    """
+    Runs one thread per buyer in `user_ids`, each with its own logged in test client.
+    The threads start buying together once every buyer of every process is ready, and
+    the outcomes are put on `queue` as a list of attempt_purchase results.
+    """
+    app = create_app(bench_config(database_url, workdir, cache=False))
+    results = []
+    lock = threading.Lock()
+
+    def buy(client):
+        barrier.wait(READY_TIMEOUT)
+        for _ in range(attempts):
+            try:
+                result = attempt_purchase(client, quantity)
+            except Exception:
+                result = ("error", None, None)
+            with lock:
+                results.append(result)
+
+    threads = []
+    for user_id in user_ids:
+        client = app.test_client()
+        # Log in through the session, checking hundreds of password hashes would
+        # take longer than the sale
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+        threads.append(threading.Thread(target=buy, args=(client,)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(results)
+
+
+def latency(durations):
+    durations = sorted(duration for duration in durations if duration is not None)
+    if not durations:
+        return None
+    return {
+        "mean_ms": round(sum(durations) / len(durations), 3),
+        "p50_ms": round(percentile(durations, 50), 3),
+        "p99_ms": round(percentile(durations, 99), 3),
+        "max_ms": round(durations[-1], 3),
+    }
+
+
+def check_stock(quantity, bought):
+    """
+    Checks the stock invariants of the ticket type after the sale.
+
+    Args:
+        quantity (int): The ticket type's stock before the sale.
+        bought (int): The number of tickets buyers were told they bought.
+
+    Returns:
+        tuple: The final stock counters, and each invariant with whether it holds.
+    """
+    ticket_type = db.session.get(TicketType, TICKET_TYPE_ID)
+    tickets = db.session.scalar(
+        select(func.count(Ticket.id)).where(Ticket.ticket_type_id == TICKET_TYPE_ID)
+    )
+    ordered = db.session.scalar(
+        select(func.coalesce(func.sum(Order.quantity), 0)).where(
+            Order.ticket_type_id == TICKET_TYPE_ID
+        )
+    )
+    stock = {
+        "quantity": ticket_type.quantity,
+        "held": ticket_type.held,
+        "sold": ticket_type.sold,
+        "tickets": tickets,
+        "ordered": ordered,
+        "status": ticket_type.status,
+    }
+    invariants = {
+        "not_oversold": ticket_type.sold <= quantity,
+        "stock_conserved": (
+            ticket_type.quantity + ticket_type.held + ticket_type.sold == quantity
+        ),
+        "counters_not_negative": min(ticket_type.quantity, ticket_type.held) >= 0,
+        "tickets_match_sold": tickets == ticket_type.sold == ordered,
+        "bought_were_sold": bought <= ticket_type.sold,
+    }
+    return stock, invariants
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("ONSALE_DATABASE_URL")
+        or "sqlite:///" + DEFAULT_DATABASE,
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument(
+        "--threads", type=int, default=50, help="buyers in each process"
+    )
+    parser.add_argument(
+        "--attempts", type=int, default=1, help="purchase attempts of each buyer"
+    )
+    parser.add_argument(
+        "--quantity", type=int, default=100, help="tickets on sale before the rush"
+    )
+    parser.add_argument(
+        "--per-order", type=int, default=1, help="tickets bought per attempt"
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        help="fail the run if more attempts than this fraction end in an error",
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    buyers = args.processes * args.threads
+    workdir = tempfile.mkdtemp(prefix="moristickets-onsale-")
+    if args.database_url == "sqlite:///" + DEFAULT_DATABASE:
+        os.makedirs(os.path.dirname(DEFAULT_DATABASE), exist_ok=True)
+
+    try:
+        app = create_app(bench_config(args.database_url, workdir, cache=False))
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            dataset.seed(users=buyers, events=1, ticket_types=1, tickets=0)
+            db.session.execute(
+                update(TicketType)
+                .where(TicketType.id == TICKET_TYPE_ID)
+                .values(quantity=args.quantity)
+            )
+            db.session.commit()
+            database = db.engine.dialect.name
+            db.engine.dispose()
+
+        # Spawned workers import the app afresh, nothing is shared with this process
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(buyers + 1)
+        queue = context.Queue()
+        processes = []
+        for i in range(args.processes):
+            user_ids = range(i * args.threads + 1, (i + 1) * args.threads + 1)
+            process = context.Process(
+                target=buyer_process,
+                args=(
+                    args.database_url,
+                    workdir,
+                    list(user_ids),
+                    args.per_order,
+                    args.attempts,
+                    barrier,
+                    queue,
+                ),
+            )
+            process.start()
+            processes.append(process)
+
+        print(f"Starting {buyers} buyers...", file=sys.stderr)
+        barrier.wait(READY_TIMEOUT)
+        start = time.perf_counter()
+        attempts = []
+        for _ in processes:
+            attempts.extend(queue.get())
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+        outcomes = dict.fromkeys(("bought", "sold_out", "expired", "error"), 0)
+        for outcome, _, _ in attempts:
+            outcomes[outcome] += 1
+        bought = outcomes["bought"] * args.per_order
+        with app.app_context():
+            stock, invariants = check_stock(args.quantity, bought)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    error_rate = outcomes["error"] / len(attempts) if attempts else 0.0
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "database": database,
+            "processes": args.processes,
+            "threads": args.threads,
+            "attempts": args.attempts,
+            "quantity": args.quantity,
+            "per_order": args.per_order,
+        },
+        "results": {
+            "attempts": len(attempts),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(attempts) / elapsed, 2),
+            "outcomes": outcomes,
+            "error_rate": round(error_rate, 4),
+            "latency": {
+                "hold": latency(hold for _, hold, _ in attempts),
+                "checkout": latency(checkout for _, _, checkout in attempts),
+            },
+            "stock": stock,
+            "invariants": invariants,
+        },
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+
+    status = 0
+    broken = [name for name, holds in invariants.items() if not holds]
+    if broken:
+        print(f"Broken invariants: {', '.join(broken)}", file=sys.stderr)
+        status = 1
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        print(f"Error rate {error_rate:.1%} is over the limit", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
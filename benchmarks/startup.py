@@ -0,0 +1,183 @@
+"""
+Benchmark of the startup of a web worker.
+
+Starts fresh interpreters that import the app, create it and serve a first request,
+and reports the median time of each step, the memory used once the first request is
+served and the heavy libraries loaded at startup, as JSON. These libraries are only
+meant to be imported on first use, so the exit status is 1 if any of them is loaded
+by create_app. With --baseline, the results are compared to a saved run and the exit
+status is also 1 if a step got slower.
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+
+With --warm-up the app is created as in a gunicorn master with --preload, which loads
+everything up front on purpose.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Nothing of the app is imported at the top, the probe times importing it
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Libraries only imported on first use, see ticket_pdf and images
+LAZY_MODULES = ("reportlab", "qrcode", "PIL", "pdfkit")
+STEPS = ("import_ms", "create_app_ms", "first_request_ms")
+
+
+def probe():
+    """Times the startup of this interpreter, and prints it as JSON."""
+    start = time.perf_counter()
+    from app import create_app
+
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    loaded = [name for name in LAZY_MODULES if name in sys.modules]
+    response = app.test_client().get("/")
+    served = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - start) * 1000,
+                "create_app_ms": (created - imported) * 1000,
+                "first_request_ms": (served - created) * 1000,
+                "status": response.status_code,
+                # Kilobytes on Linux
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "loaded_at_startup": loaded,
+            }
+        )
+    )
+
+
+def run_probe(env):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--probe"],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--warm-up", action="store_true", help="create the app with WARM_UP on"
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare to the results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slow down, as a fraction, reported as a regression",
+    )
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.probe:
+        probe()
+        return 0
+
+    from benchmarks.bench import git_revision
+
+    workdir = tempfile.mkdtemp(prefix="moristickets-startup-")
+    env = dict(
+        os.environ,
+        SECRET_KEY=os.environ.get("SECRET_KEY") or "bench",
+        DATABASE_URL="sqlite:///" + os.path.join(workdir, "app.db"),
+        WAITING_ROOM_DB=os.path.join(workdir, "waiting_room.db"),
+        PAGE_CACHE_DB=os.path.join(workdir, "page_cache.db"),
+        PDF_CACHE_DIR=os.path.join(workdir, "pdf_cache"),
+        METRICS_DIR=os.path.join(workdir, "metrics"),
+        WARM_UP="1" if args.warm_up else "0",
+    )
+    try:
+        # The first request needs the tables, create them without timing it
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "app", "db", "upgrade"],
+            cwd=BASE_DIR,
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        runs = [run_probe(env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "warm_up": args.warm_up,
+        },
+        "results": {
+            step: round(median([run[step] for run in runs]), 1) for step in STEPS
+        },
+    }
+    results["results"]["max_rss_mb"] = round(
+        median([run["max_rss_mb"] for run in runs]), 1
+    )
+    loaded = sorted({name for run in runs for name in run["loaded_at_startup"]})
+    results["results"]["loaded_at_startup"] = loaded
+    errors = sum(1 for run in runs if run["status"] != 200)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+
+    status = 0
+    if errors:
+        print(f"{errors} first requests failed", file=sys.stderr)
+        status = 1
+    if loaded and not args.warm_up:
+        print(f"Loaded at startup: {', '.join(loaded)}", file=sys.stderr)
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["results"]
+        for step in STEPS:
+            if not baseline[step]:
+                continue
+            change = results["results"][step] / baseline[step] - 1
+            print(
+                f"{step}: {baseline[step]:.1f} -> {results['results'][step]:.1f} ms "
+                f"({change:+.0%})",
+                file=sys.stderr,
+            )
+            if change > args.threshold:
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
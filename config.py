@@ -14,3 +14,65 @@ class Config(object):
     # Database URl configurations
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Waiting room configurations, a rate of 0 disables the waiting room
+    WAITING_ROOM_RATE = int(os.environ.get("WAITING_ROOM_RATE") or 20)
+    WAITING_ROOM_PASS_TTL = int(os.environ.get("WAITING_ROOM_PASS_TTL") or 600)
+    WAITING_ROOM_IDLE_TIMEOUT = int(os.environ.get("WAITING_ROOM_IDLE_TIMEOUT") or 30)
+    WAITING_ROOM_DB = os.environ.get("WAITING_ROOM_DB")
+
+    # Ticket hold configurations, a reaper interval of 0 disables the reaper thread
+    HOLD_TTL = int(os.environ.get("HOLD_TTL") or 600)
+    HOLD_REAPER_INTERVAL = int(os.environ.get("HOLD_REAPER_INTERVAL") or 30)
+    HOLD_REAPER_BATCH = int(os.environ.get("HOLD_REAPER_BATCH") or 500)
+
+    # Ticket PDF cache configurations, a size cap of 0 disables the cache
+    PDF_CACHE_MAX_BYTES = int(
+        os.environ.get("PDF_CACHE_MAX_BYTES") or 256 * 1024 * 1024
+    )
+    PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR")
+
+    # Ticket rendering pool and bulk export configurations
+    RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS") or os.cpu_count() or 2)
+    # Render ticket downloads in the pool instead of the web worker, which needs the
+    # PDF cache, with at most RENDER_QUEUE_DEPTH jobs running per web worker
+    RENDER_ASYNC = (os.environ.get("RENDER_ASYNC") or "").lower() in ("1", "true")
+    RENDER_QUEUE_DEPTH = int(os.environ.get("RENDER_QUEUE_DEPTH") or 64)
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE") or 100)
+
+    # Seconds before a process reloads the gate check-in index of an event
+    CHECKIN_INDEX_TTL = int(os.environ.get("CHECKIN_INDEX_TTL") or 300)
+
+    # Seconds before a process reloads the list of categories, sooner when another
+    # process adds one and the page cache is on
+    REFERENCE_CACHE_TTL = int(os.environ.get("REFERENCE_CACHE_TTL") or 300)
+
+    # Seconds a process loads the logged in user from its snapshot instead of the
+    # database, 0 disables the snapshots
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL") or 30)
+
+    # Seconds an unreferenced uploaded image is kept before garbage collection removes
+    # it, so uploads whose reference is not committed yet survive
+    IMAGE_GC_GRACE = int(os.environ.get("IMAGE_GC_GRACE") or 3600)
+
+    # Uploads larger than IMAGE_MAX_BYTES or that decode to more than IMAGE_MAX_PIXELS
+    # are rejected, JPEGs count at the reduced scale they are decoded at
+    IMAGE_MAX_BYTES = int(os.environ.get("IMAGE_MAX_BYTES") or 20 * 1024 * 1024)
+    IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS") or 16000000)
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH") or 32 * 1024 * 1024)
+
+    # Rows per page of the event and ticket listings
+    PER_PAGE = int(os.environ.get("PER_PAGE") or 12)
+
+    # Seconds rendered pages and fragments are cached, 0 disables the cache
+    PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL") or 300)
+    PAGE_CACHE_DB = os.environ.get("PAGE_CACHE_DB")
+
+    # Per request metrics on /metrics, and optionally a Server-Timing header
+    METRICS_ENABLED = (os.environ.get("METRICS_ENABLED") or "1") in ("1", "true")
+    METRICS_DIR = os.environ.get("METRICS_DIR")
+    METRICS_SERVER_TIMING = os.environ.get("METRICS_SERVER_TIMING") in ("1", "true")
+
+    # Compile templates and import the PDF and imaging libraries when the app is
+    # created, instead of on first use, for gunicorn --preload, see gunicorn.conf.py
+    WARM_UP = (os.environ.get("WARM_UP") or "").lower() in ("1", "true")
@@ -0,0 +1,20 @@
+import os
+
+# Create the app once in the master and fork the workers from it, so they share its
+# imported libraries and compiled templates and start serving straight away
+preload_app = True
+os.environ.setdefault("WARM_UP", "1")
+
+
+def when_ready(server):
+    # Request metrics of a previous run of the server don't add up with this one's
+    from app import metrics
+
+    metrics.clear()
+
+
+def child_exit(server, worker):
+    # Fold the request metrics of the worker into those of the exited workers
+    from app import metrics
+
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,113 @@
+"""add orders, holds and stock counters
+
+Revision ID: 641a72a0fef8
+Revises: 12b43d2415d4
+Create Date: 2026-10-16 22:48:46.112094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "641a72a0fef8"
+down_revision = "12b43d2415d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "order",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("ticket_type_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price_per_ticket", sa.Float(), nullable=False),
+        sa.Column("total_price", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["event_id"],
+            ["event.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["ticket_type_id"],
+            ["ticket_type.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "ticket_hold",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("ticket_type_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ticket_type_id"],
+            ["ticket_type.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["user.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("ticket_hold", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_ticket_hold_expires_at"), ["expires_at"], unique=False
+        )
+
+    with op.batch_alter_table("ticket_type", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("held", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("sold", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    with op.batch_alter_table("ticket", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("order_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_ticket_order_id_order", "order", ["order_id"], ["id"]
+        )
+
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("order_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_transactions_order_id_order", "order", ["order_id"], ["id"]
+        )
+
+    # The baseline app took sold tickets out of the quantity, which stays the number
+    # of tickets left, and every ticket it issued was sold
+    op.execute(
+        "UPDATE ticket_type SET sold = ("
+        "SELECT count(*) FROM ticket WHERE ticket.ticket_type_id = ticket_type.id"
+        ")"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_transactions_order_id_order", type_="foreignkey")
+        batch_op.drop_column("order_id")
+
+    with op.batch_alter_table("ticket", schema=None) as batch_op:
+        batch_op.drop_constraint("fk_ticket_order_id_order", type_="foreignkey")
+        batch_op.drop_column("order_id")
+
+    with op.batch_alter_table("ticket_type", schema=None) as batch_op:
+        batch_op.drop_column("sold")
+        batch_op.drop_column("held")
+
+    with op.batch_alter_table("ticket_hold", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_ticket_hold_expires_at"))
+
+    op.drop_table("ticket_hold")
+    op.drop_table("order")
@@ -0,0 +1,56 @@
+"""add indexes for the hot queries
+
+Revision ID: 8232299f99c7
+Revises: 641a72a0fef8
+Create Date: 2026-10-16 22:48:55.727787
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8232299f99c7"
+down_revision = "641a72a0fef8"
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns)
+INDEXES = [
+    ("event", "ix_event_created_at_id", ["created_at", "id"]),
+    ("event", "ix_event_start_date_id", ["start_date", "id"]),
+    ("event", "ix_event_category_id_start_date", ["category_id", "start_date", "id"]),
+    ("organizers", "ix_organizers_event_id_user_id", ["event_id", "user_id"]),
+    ("ticket_type", "ix_ticket_type_event_id", ["event_id", "id"]),
+    ("ticket", "ix_ticket_user_id_id", ["user_id", "id"]),
+    ("ticket", "ix_ticket_ticket_type_id_use_status", ["ticket_type_id", "use_status"]),
+    ("ticket", "ix_ticket_order_id", ["order_id"]),
+    (
+        "ticket_hold",
+        "ix_ticket_hold_ticket_type_id_expires_at",
+        ["ticket_type_id", "expires_at"],
+    ),
+    ("order", "ix_order_user_id", ["user_id"]),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    postgresql = bind.dialect.name == "postgresql"
+    for table, name, columns in INDEXES:
+        # Databases created with create_all may already have some of them
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        if postgresql:
+            # Build without locking the table against writes, which can't run in
+            # the migration's transaction
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+        else:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,98 @@
+"""add full text search of events
+
+Revision ID: a02bc174a112
+Revises: 8232299f99c7
+Create Date: 2026-10-16 23:41:12.408153
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "a02bc174a112"
+down_revision = "8232299f99c7"
+branch_labels = None
+depends_on = None
+
+# A copy of app.utills.search at the time of this revision, migrations don't change
+# with the app
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5(
+        event_name, description, venue,
+        content='event', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    "INSERT INTO event_fts(event_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_insert AFTER INSERT ON event BEGIN
+        INSERT INTO event_fts(rowid, event_name, description, venue)
+        VALUES (new.id, new.event_name, new.description, new.venue);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_delete AFTER DELETE ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, event_name, description, venue)
+        VALUES ('delete', old.id, old.event_name, old.description, old.venue);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_fts_update
+    AFTER UPDATE OF event_name, description, venue ON event BEGIN
+        INSERT INTO event_fts(event_fts, rowid, event_name, description, venue)
+        VALUES ('delete', old.id, old.event_name, old.description, old.venue);
+        INSERT INTO event_fts(rowid, event_name, description, venue)
+        VALUES (new.id, new.event_name, new.description, new.venue);
+    END
+    """,
+    # Index the existing events
+    "INSERT INTO event_fts(event_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS event_fts_update",
+    "DROP TRIGGER IF EXISTS event_fts_delete",
+    "DROP TRIGGER IF EXISTS event_fts_insert",
+    "DROP TABLE IF EXISTS event_fts",
+]
+
+POSTGRESQL_UPGRADE = [
+    """
+    ALTER TABLE event ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(event_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(venue, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+]
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_event_search_vector",
+    "ALTER TABLE event DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        # Adding the generated column rewrites the table once, the index is then
+        # built without locking it against writes
+        for statement in POSTGRESQL_UPGRADE:
+            op.execute(statement)
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_event_search_vector "
+                "ON event USING gin (search_vector)"
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        for statement in POSTGRESQL_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,34 @@
+"""add an index for the event filters
+
+Revision ID: c04a356d1717
+Revises: a02bc174a112
+Create Date: 2026-10-17 00:32:47.915306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c04a356d1717"
+down_revision = "a02bc174a112"
+branch_labels = None
+depends_on = None
+
+NAME = "ix_event_start_date_price_category_id"
+COLUMNS = ["start_date", "price", "category_id"]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if NAME in {index["name"] for index in sa.inspect(bind).get_indexes("event")}:
+        return
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(NAME, "event", COLUMNS, postgresql_concurrently=True)
+    else:
+        op.create_index(NAME, "event", COLUMNS)
+
+
+def downgrade():
+    op.drop_index(NAME, table_name="event")
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from datetime import date, time, timedelta
+import pytest
+from app import create_app, user_cache
+from app.models.models import Event, TicketType, User, db
+from app.utills import checkin
+from app.utills.reference import categories
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    class TestConfig(Config):
+        TESTING = True
+        SECRET_KEY = "tests"
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        WAITING_ROOM_DB = str(tmp_path / "waiting_room.db")
+        PAGE_CACHE_DB = str(tmp_path / "page_cache.db")
+        PDF_CACHE_DIR = str(tmp_path / "ticket_pdfs")
+        METRICS_ENABLED = False
+        HOLD_REAPER_INTERVAL = 0
+        WARM_UP = False
+
+    # The caches of the process outlive an app, start every test without them
+    monkeypatch.setattr(categories, "_ids", {})
+    monkeypatch.setattr(categories, "_complete", False)
+    monkeypatch.setattr(user_cache, "_snapshots", {})
+    monkeypatch.setattr(checkin, "_indexes", OrderedDict())
+
+    # Requests get their own app context and session, like in production, so seed
+    # data in an app context of the test rather than in one held around the requests
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+
+def make_user(username):
+    user = User(username=username, email=f"{username}@example.com")
+    user.hash_password("password")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_event(organizer, name="Concert", category="Music", days=5, quantity=10):
+    """Adds an event in `days` days, with one ticket type of `quantity` tickets."""
+    category_id = categories.get_or_create(category)
+    start = date.today() + timedelta(days=days)
+    event = Event(
+        event_name=name,
+        description=f"{name} description",
+        start_date=start,
+        end_date=start,
+        start_time=time(18),
+        end_time=time(22),
+        venue="City Hall",
+        capacity=100,
+        price=10,
+        organizers=[organizer],
+        category_id=category_id,
+    )
+    db.session.add(event)
+    db.session.flush()
+    db.session.add(
+        TicketType(
+            ticket_name="General admission",
+            ticket_type="Ordinary",
+            price=10,
+            quantity=quantity,
+            event_id=event.id,
+        )
+    )
+    db.session.commit()
+    return event
+
+
+def login(client, username):
+    response = client.post(
+        "/login", data={"email": f"{username}@example.com", "password": "password"}
+    )
+    assert response.status_code == 302
+    return response
@@ -0,0 +1,95 @@
+import pytest
+from conftest import login, make_event, make_user
+from app.models.models import Ticket, TicketType, db
+from app.utills import checkin
+from app.utills.checkin import CheckinIndex
+from app.utills.holds import confirm_hold, create_hold
+from app.utills.ticket_token import make_ticket_token, verify_ticket_token
+
+
+@pytest.fixture
+def ids(app):
+    """An event with two tickets sold to a buyer, and another event."""
+    with app.app_context():
+        buyer = make_user("buyer")
+        event = make_event(make_user("organizer"), quantity=4)
+        other = make_event(make_user("other"), name="Match")
+        hold = create_hold(buyer.id, event.ticket_types[0], 2, 600)
+        db.session.flush()
+        order = confirm_hold(hold)
+        db.session.commit()
+        return {
+            "event": event.id,
+            "other_event": other.id,
+            "other_ticket_type": other.ticket_types[0].id,
+            "tickets": [ticket.id for ticket in order.tickets],
+        }
+
+
+def token_for(ticket_id, event_id=None, ticket_type_id=None):
+    ticket = db.session.get(Ticket, ticket_id)
+    token = make_ticket_token(
+        "tests",
+        ticket.id,
+        event_id or ticket.ticket_type.event_id,
+        ticket_type_id or ticket.ticket_type_id,
+    )
+    return verify_ticket_token("tests", token)
+
+
+def test_check_in_admits_once(app, ids):
+    with app.app_context():
+        index = CheckinIndex.load(ids["event"])
+        assert index.counts() == {"checked_in": 0, "remaining": 2}
+        token = token_for(ids["tickets"][0])
+        assert index.check_in(token) == "admitted"
+        assert index.check_in(token) == "duplicate"
+        assert index.counts() == {"checked_in": 1, "remaining": 1}
+        assert db.session.get(Ticket, ids["tickets"][0]).use_status == "used"
+
+
+def test_check_in_by_another_process_is_a_duplicate(app, ids):
+    with app.app_context():
+        first = CheckinIndex.load(ids["event"])
+        second = CheckinIndex.load(ids["event"])
+        token = token_for(ids["tickets"][0])
+        assert first.check_in(token) == "admitted"
+        assert second.check_in(token) == "duplicate"
+        assert second.counts() == {"checked_in": 1, "remaining": 1}
+
+
+def test_check_in_of_a_wrong_ticket_type_is_invalid(app, ids):
+    with app.app_context():
+        index = CheckinIndex.load(ids["event"])
+        token = token_for(ids["tickets"][0], ticket_type_id=ids["other_ticket_type"])
+        assert index.check_in(token) == "invalid"
+        assert db.session.get(Ticket, ids["tickets"][0]).use_status == "unused"
+
+
+def test_check_in_of_a_deleted_ticket_is_invalid(app, ids):
+    with app.app_context():
+        index = CheckinIndex.load(ids["event"])
+        token = token_for(ids["tickets"][0])
+        db.session.delete(db.session.get(Ticket, ids["tickets"][0]))
+        db.session.commit()
+        assert index.check_in(token) == "invalid"
+        assert index.counts() == {"checked_in": 0, "remaining": 1}
+
+
+def test_gate_rejects_a_ticket_of_another_event(app, client, ids):
+    with app.app_context():
+        ticket = db.session.get(Ticket, ids["tickets"][0])
+        token = make_ticket_token(
+            "tests", ticket.id, ids["other_event"], ticket.ticket_type_id
+        )
+    login(client, "organizer")
+    response = client.post(f"/event/{ids['event']}/checkin", json={"token": token})
+    assert response.status_code == 400
+    assert response.json["result"] == "wrong_event"
+
+
+def test_gate_loads_no_index_for_other_users(app, client, ids):
+    login(client, "other")
+    response = client.get(f"/event/{ids['event']}/checkin")
+    assert response.status_code == 403
+    assert ids["event"] not in checkin._indexes
@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import func, select
+from conftest import login, make_event, make_user
+from app.models.models import Ticket, TicketHold, TicketType, db
+from app.utills.holds import (
+    cancel_hold,
+    confirm_hold,
+    create_hold,
+    release_expired_holds,
+)
+
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        buyer = make_user("buyer")
+        event = make_event(make_user("organizer"), quantity=4)
+        ids = {
+            "buyer": buyer.id,
+            "event": event.id,
+            "ticket_type": event.ticket_types[0].id,
+        }
+    return ids
+
+
+def stock(ticket_type_id):
+    return db.session.execute(
+        select(TicketType.quantity, TicketType.held, TicketType.sold).where(
+            TicketType.id == ticket_type_id
+        )
+    ).one()
+
+
+def hold(ids, quantity, ttl=600):
+    ticket_type = db.session.get(TicketType, ids["ticket_type"])
+    hold = create_hold(ids["buyer"], ticket_type, quantity, ttl)
+    db.session.flush()
+    return hold
+
+
+def test_confirm_turns_the_hold_into_an_order(app, ids):
+    with app.app_context():
+        order = confirm_hold(hold(ids, 3))
+        db.session.commit()
+        assert order.quantity == 3
+        assert order.tickets.count() == 3
+        assert stock(ids["ticket_type"]) == (1, 0, 3)
+        assert db.session.scalar(select(func.count()).select_from(TicketHold)) == 0
+
+
+def test_expired_hold_is_not_confirmed(app, ids):
+    with app.app_context():
+        expired = hold(ids, 2, ttl=-1)
+        db.session.commit()
+        assert confirm_hold(expired) is None
+        db.session.rollback()
+        assert stock(ids["ticket_type"]) == (2, 2, 0)
+        assert db.session.scalar(select(func.count()).select_from(Ticket)) == 0
+
+
+def test_cancel_returns_the_units_once(app, ids):
+    with app.app_context():
+        held = hold(ids, 2)
+        assert cancel_hold(held)
+        assert not cancel_hold(held)
+        assert stock(ids["ticket_type"]) == (4, 0, 0)
+
+
+def test_reaper_releases_only_expired_holds(app, ids):
+    with app.app_context():
+        hold(ids, 1, ttl=-1)
+        hold(ids, 2, ttl=-1)
+        hold(ids, 1)
+        assert stock(ids["ticket_type"]) == (0, 4, 0)
+        assert release_expired_holds(batch_size=1) == 1
+        assert release_expired_holds() == 1
+        assert release_expired_holds() == 0
+        db.session.commit()
+        assert stock(ids["ticket_type"]) == (3, 1, 0)
+
+
+def test_purchase_releases_expired_holds_of_a_sold_out_ticket_type(app, client, ids):
+    with app.app_context():
+        hold(ids, 4, ttl=-1)
+        db.session.commit()
+        assert db.session.get(TicketType, ids["ticket_type"]).status == "sold"
+
+    login(client, "buyer")
+    response = client.post(
+        f"/event/{ids['event']}/purchase",
+        data={"ticket_type_id": ids["ticket_type"], "quantity": 2},
+    )
+    assert response.status_code == 302
+    assert "/checkout/" in response.headers["Location"]
+    with app.app_context():
+        assert stock(ids["ticket_type"]) == (2, 2, 0)
+
+
+def test_deleted_ticket_returns_its_unit(app, client, ids):
+    with app.app_context():
+        order = confirm_hold(hold(ids, 4))
+        db.session.commit()
+        ticket_id = order.tickets.first().id
+
+    login(client, "buyer")
+    response = client.post(f"/ticket/{ticket_id}/delete")
+    assert response.status_code == 302
+    with app.app_context():
+        assert stock(ids["ticket_type"]) == (1, 0, 3)
+        assert db.session.get(TicketType, ids["ticket_type"]).status == "available"
+
+
+def test_checkout_over_the_balance_keeps_the_hold(app, client, ids):
+    with app.app_context():
+        db.session.get(TicketType, ids["ticket_type"]).price = 400
+        held = hold(ids, 3)
+        db.session.commit()
+        hold_id = held.id
+
+    login(client, "buyer")
+    response = client.post(f"/checkout/{hold_id}", data={"confirm": "Confirm and Pay"})
+    assert response.status_code == 200
+    assert b"Insufficient funds" in response.data
+    with app.app_context():
+        assert stock(ids["ticket_type"]) == (1, 3, 0)
+        assert db.session.scalar(select(func.count()).select_from(Ticket)) == 0
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import select
+from conftest import make_event, make_user
+from app.models.models import TicketType, db
+from app.utills.inventory import (
+    hold_tickets,
+    release_held_tickets,
+    return_sold_tickets,
+    sell_held_tickets,
+)
+
+
+@pytest.fixture
+def ticket_type_id(app):
+    with app.app_context():
+        event = make_event(make_user("organizer"), quantity=5)
+        ticket_type_id = event.ticket_types[0].id
+    with app.app_context():
+        yield ticket_type_id
+
+
+def stock(ticket_type_id):
+    """Returns the (quantity, held, sold, status) of a ticket type, as stored."""
+    return db.session.execute(
+        select(
+            TicketType.quantity, TicketType.held, TicketType.sold, TicketType.status
+        ).where(TicketType.id == ticket_type_id)
+    ).one()
+
+
+def test_hold_moves_free_units_to_held(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 2)
+    assert stock(ticket_type_id) == (3, 2, 0, "available")
+
+
+def test_hold_never_oversells(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 3)
+    assert not hold_tickets(ticket_type_id, 3)
+    assert stock(ticket_type_id) == (2, 3, 0, "available")
+
+
+def test_hold_of_the_last_units_sells_out(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 5)
+    assert stock(ticket_type_id) == (0, 5, 0, "sold")
+    assert not hold_tickets(ticket_type_id, 1)
+
+
+def test_hold_needs_an_available_ticket_type(ticket_type_id):
+    db.session.get(TicketType, ticket_type_id).status = "canceled"
+    db.session.flush()
+    assert not hold_tickets(ticket_type_id, 1)
+    assert stock(ticket_type_id) == (5, 0, 0, "canceled")
+
+
+def test_hold_of_nothing_is_refused(ticket_type_id):
+    assert not hold_tickets(ticket_type_id, 0)
+    assert stock(ticket_type_id) == (5, 0, 0, "available")
+
+
+def test_sell_only_held_units(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 2)
+    assert not sell_held_tickets(ticket_type_id, 3)
+    assert sell_held_tickets(ticket_type_id, 2)
+    assert stock(ticket_type_id) == (3, 0, 2, "available")
+
+
+def test_release_makes_a_sold_out_ticket_type_available(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 5)
+    assert release_held_tickets(ticket_type_id, 2)
+    assert stock(ticket_type_id) == (2, 3, 0, "available")
+    assert not release_held_tickets(ticket_type_id, 4)
+
+
+def test_return_makes_sold_units_free_again(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 5)
+    assert sell_held_tickets(ticket_type_id, 5)
+    assert return_sold_tickets(ticket_type_id, 1)
+    assert stock(ticket_type_id) == (1, 0, 4, "available")
+    assert not return_sold_tickets(ticket_type_id, 5)
+
+
+def test_moves_roll_back_with_the_transaction(ticket_type_id):
+    assert hold_tickets(ticket_type_id, 2)
+    db.session.rollback()
+    assert stock(ticket_type_id) == (5, 0, 0, "available")
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+import pytest
+from conftest import login, make_event, make_user
+from app.models import models
+from app.models.models import User, db
+from app.utills.query_count import assert_max_queries
+
+
+@pytest.fixture
+def event_id(app):
+    with app.app_context():
+        make_user("visitor")
+        return make_event(make_user("organizer"), name="Concert").id
+
+
+def rename(app, username, new_username):
+    with app.app_context():
+        User.query.filter_by(username=username).one().username = new_username
+        db.session.commit()
+
+
+def test_anonymous_pages_are_served_from_the_cache(client, engine, event_id):
+    page = client.get(f"/event/{event_id}").data
+    with assert_max_queries(0, engine):
+        assert client.get(f"/event/{event_id}").data == page
+
+
+def test_logged_in_pages_are_not_cached(client, engine, event_id):
+    login(client, "visitor")
+    client.get(f"/event/{event_id}")
+    with assert_max_queries(3, engine) as counter:
+        client.get(f"/event/{event_id}")
+    assert counter.count > 0
+
+
+def test_event_update_invalidates_its_pages(app, client, event_id):
+    assert b"Concert" in client.get(f"/event/{event_id}").data
+    assert b"Concert" in client.get("/").data
+
+    organizer = app.test_client()
+    login(organizer, "organizer")
+    start = date.today() + timedelta(days=7)
+    response = organizer.post(
+        f"/event/{event_id}/update",
+        data={
+            "event_name": "Festival",
+            "description": "Three days of music",
+            "start_date": start.isoformat(),
+            "end_date": start.isoformat(),
+            "start_time": "18:00",
+            "end_time": "22:00",
+            "venue": "City Hall",
+            "capacity": 100,
+            "price": 10,
+            "category": "Music",
+        },
+    )
+    assert response.status_code == 302
+
+    assert b"Festival" in client.get(f"/event/{event_id}").data
+    assert b"Festival" in client.get("/").data
+
+
+def test_organizer_change_invalidates_only_their_pages(app, client, engine, event_id):
+    with app.app_context():
+        other_id = make_event(make_user("other"), name="Match").id
+    client.get(f"/event/{event_id}")
+    client.get(f"/event/{other_id}")
+
+    rename(app, "organizer", "promoter")
+    assert b"promoter" in client.get(f"/event/{event_id}").data
+    with assert_max_queries(0, engine):
+        assert b"other" in client.get(f"/event/{other_id}").data
+
+
+def test_account_update_invalidates_the_user_tag(app, event_id):
+    cache = app.extensions["page_cache"]
+    with app.app_context():
+        user_id = User.query.filter_by(username="organizer").one().id
+    tag = f"user:{user_id}"
+    before = cache.versions([tag])[tag]
+
+    organizer = app.test_client()
+    login(organizer, "organizer")
+    response = organizer.post(
+        "/profile/update",
+        data={"username": "promoter", "email": "organizer@example.com"},
+    )
+    assert response.status_code == 302
+    assert cache.versions([tag])[tag] != before
+
+
+def test_author_change_invalidates_the_testimonials(app, client, event_id):
+    with app.app_context():
+        author = User.query.filter_by(username="visitor").one()
+        db.session.add(
+            models.Testimonial(
+                testimony="Great nights out", author=author, author_role="Fan"
+            )
+        )
+        db.session.commit()
+    assert b"visitor, Fan" in client.get("/").data
+
+    rename(app, "visitor", "regular")
+    assert b"regular, Fan" in client.get("/").data
@@ -0,0 +1,33 @@
+import os
+import pytest
+from flask import Flask
+from app.utills.pdf_cache import PdfCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def make_cache(max_bytes):
+        app = Flask(__name__)
+        app.config.update(PDF_CACHE_MAX_BYTES=max_bytes, PDF_CACHE_DIR=str(tmp_path))
+        return PdfCache(app)
+
+    return make_cache
+
+
+def test_least_recently_used_pdfs_are_evicted(make_cache, tmp_path):
+    cache = make_cache(1000)
+    for ticket_id in range(3):
+        cache.put(ticket_id, "v", b"x" * 300)
+    assert cache.get(0, "v")
+    cache.put(3, "v", b"x" * 300)
+    assert sorted(os.listdir(tmp_path)) == ["0-v.pdf", "2-v.pdf", "3-v.pdf"]
+
+
+def test_directory_is_scanned_only_every_few_puts(make_cache, monkeypatch):
+    cache = make_cache(10**6)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+    for ticket_id in range(cache.SCAN_EVERY + 1):
+        cache.put(ticket_id, "v", b"x" * 10)
+    assert len(scans) == 2
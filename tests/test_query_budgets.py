@@ -0,0 +1,100 @@
+import pytest
+from conftest import login, make_event, make_user
+from app.models.models import TicketType, db
+from app.utills.holds import confirm_hold, create_hold
+from app.utills.query_count import assert_max_queries
+
+
+@pytest.fixture
+def catalog(app):
+    """
+    Fifteen events in three categories by three organizers, and a buyer holding two
+    tickets to each of the first five, enough rows for an N+1 query to show.
+    """
+    with app.app_context():
+        organizers = [make_user(f"organizer{i}") for i in range(3)]
+        events = [
+            make_event(
+                organizers[i % 3],
+                name=f"Event {i}",
+                category=("Music", "Sport", "Art")[i % 3],
+                days=i + 1,
+            )
+            for i in range(15)
+        ]
+        buyer = make_user("buyer")
+        for ticket_type in TicketType.query.order_by(TicketType.id).limit(5).all():
+            hold = create_hold(buyer.id, ticket_type, 2, 600)
+            db.session.flush()
+            confirm_hold(hold)
+        db.session.commit()
+        return {"buyer_id": buyer.id, "event_id": events[0].id}
+
+
+def test_homepage(client, engine, catalog):
+    with assert_max_queries(8, engine):
+        response = client.get("/")
+    assert response.status_code == 200
+    assert b"Event 14" in response.data
+
+
+def test_homepage_logged_in(client, engine, catalog):
+    login(client, "buyer")
+    with assert_max_queries(8, engine):
+        response = client.get("/")
+    assert response.status_code == 200
+
+
+def test_user_home(client, engine, catalog):
+    login(client, "buyer")
+    with assert_max_queries(5, engine):
+        response = client.get("/home")
+    assert response.status_code == 200
+    assert b"Event 14" in response.data
+
+
+def test_organizer_events(client, engine, catalog):
+    login(client, "buyer")
+    with assert_max_queries(6, engine):
+        response = client.get("/event/user/organizer0")
+    assert response.status_code == 200
+    assert b"Event 0" in response.data
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/events",
+        "/events?q=event",
+        "/events?location=city",
+        "/events?category=Music&price=up-to-20&available=1",
+    ],
+)
+def test_events_list(client, engine, catalog, url):
+    login(client, "buyer")
+    with assert_max_queries(6, engine):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert b"Event 0" in response.data
+
+
+def test_event_detail(client, engine, catalog):
+    with assert_max_queries(3, engine):
+        response = client.get(f"/event/{catalog['event_id']}")
+    assert response.status_code == 200
+    assert b"organizer0" in response.data
+
+
+def test_ticket_type_list(client, engine, catalog):
+    login(client, "buyer")
+    with assert_max_queries(4, engine):
+        response = client.get("/tickets")
+    assert response.status_code == 200
+
+
+def test_user_tickets(client, engine, catalog):
+    login(client, "buyer")
+    with assert_max_queries(4, engine):
+        response = client.get(f"/users/{catalog['buyer_id']}/tickets")
+    assert response.status_code == 200
+    assert response.data.count(b'id="deleteModalLabel') == 10
@@ -0,0 +1,65 @@
+import base64
+from app.utills import ticket_token
+from app.utills.ticket_token import (
+    TicketToken,
+    make_ticket_token,
+    verify_ticket_token,
+)
+
+SECRET = "tests"
+
+
+def encode(raw):
+    return base64.b32encode(raw).decode().rstrip("=")
+
+
+def decode(token):
+    return base64.b32decode(token + "=" * (-len(token) % 8))
+
+
+def test_round_trip():
+    token = make_ticket_token(SECRET, 123456, 42, 7)
+    assert len(token) == 34
+    assert verify_ticket_token(SECRET, token) == TicketToken(123456, 42, 7)
+
+
+def test_scanned_token_is_normalized():
+    token = make_ticket_token(SECRET, 1, 2, 3)
+    assert verify_ticket_token(SECRET, f" {token.lower()}\n") == TicketToken(1, 2, 3)
+
+
+def test_tampered_mac_is_rejected():
+    raw = bytearray(decode(make_ticket_token(SECRET, 1, 2, 3)))
+    raw[-1] ^= 1
+    assert verify_ticket_token(SECRET, encode(bytes(raw))) is None
+
+
+def test_tampered_payload_is_rejected():
+    raw = bytearray(decode(make_ticket_token(SECRET, 1, 2, 3)))
+    raw[4] ^= 1
+    assert verify_ticket_token(SECRET, encode(bytes(raw))) is None
+
+
+def test_wrong_secret_is_rejected():
+    token = make_ticket_token(SECRET, 1, 2, 3)
+    assert verify_ticket_token("another secret", token) is None
+
+
+def test_wrong_length_is_rejected():
+    raw = decode(make_ticket_token(SECRET, 1, 2, 3))
+    assert verify_ticket_token(SECRET, encode(raw[:-1])) is None
+    assert verify_ticket_token(SECRET, encode(raw + b"\0")) is None
+    assert verify_ticket_token(SECRET, "") is None
+
+
+def test_malformed_token_is_rejected():
+    assert verify_ticket_token(SECRET, "not a token!") is None
+
+
+def test_wrong_version_is_rejected(monkeypatch):
+    # A correctly signed token of another version
+    monkeypatch.setattr(ticket_token, "TOKEN_VERSION", 2)
+    token = make_ticket_token(SECRET, 1, 2, 3)
+    assert decode(token)[0] == 2
+    monkeypatch.undo()
+    assert verify_ticket_token(SECRET, token) is None
@@ -0,0 +1,79 @@
+import pytest
+from conftest import login, make_user
+from app import page_cache, user_cache
+from app.models.models import User, db
+from app.utills.query_count import assert_max_queries
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        return make_user("visitor").id
+
+
+def cached(app, user_id):
+    """Loads the user in a fresh app context, filling its snapshot."""
+    with app.app_context():
+        user_cache.load(user_id)
+    return user_id in user_cache._snapshots
+
+
+def test_hit_runs_no_query(app, engine, user_id):
+    assert cached(app, user_id)
+    with app.app_context():
+        with assert_max_queries(0, engine):
+            user = user_cache.load(user_id)
+            assert user.username == "visitor"
+            assert db.session.get(User, user_id) is user
+
+
+def test_changed_user_of_another_process_is_reloaded(app, engine, user_id):
+    assert cached(app, user_id)
+    page_cache.invalidate(f"user:{user_id}")
+    with app.app_context():
+        with assert_max_queries(1, engine) as counter:
+            user_cache.load(user_id)
+        assert counter.count == 1
+
+
+def test_update_drops_the_snapshot(app, user_id):
+    assert cached(app, user_id)
+    with app.app_context():
+        db.session.get(User, user_id).username = "regular"
+        db.session.commit()
+    assert user_id not in user_cache._snapshots
+    with app.app_context():
+        assert user_cache.load(user_id).username == "regular"
+
+
+def test_rolled_back_update_keeps_the_snapshot(app, user_id):
+    assert cached(app, user_id)
+    with app.app_context():
+        db.session.get(User, user_id).username = "regular"
+        db.session.flush()
+        db.session.rollback()
+    assert user_id in user_cache._snapshots
+
+
+def test_delete_drops_the_snapshot(app, user_id):
+    assert cached(app, user_id)
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+    assert user_id not in user_cache._snapshots
+    with app.app_context():
+        assert user_cache.load(user_id) is None
+
+
+def test_account_update_drops_the_snapshot(app, client, user_id):
+    login(client, "visitor")
+    client.get("/profile")
+    assert user_id in user_cache._snapshots
+
+    response = client.post(
+        "/profile/update",
+        data={"username": "regular", "email": "visitor@example.com"},
+    )
+    assert response.status_code == 302
+    assert user_id not in user_cache._snapshots
+    assert b"regular" in client.get("/profile").data
@@ -0,0 +1,115 @@
+import sqlite3
+import pytest
+from flask import Flask
+from conftest import login, make_event, make_user
+from app.utills import waiting_room
+from app.utills.waiting_room import WaitingRoom
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(waiting_room, "time", clock)
+    return clock
+
+
+def make_room(tmp_path, rate, idle_timeout=30, pass_ttl=600):
+    app = Flask(__name__)
+    app.config.update(
+        WAITING_ROOM_RATE=rate,
+        WAITING_ROOM_IDLE_TIMEOUT=idle_timeout,
+        WAITING_ROOM_PASS_TTL=pass_ttl,
+        WAITING_ROOM_DB=str(tmp_path / "waiting_room.db"),
+    )
+    return WaitingRoom(app)
+
+
+def queued(room):
+    conn = sqlite3.connect(room.path)
+    try:
+        return conn.execute("SELECT count(*) FROM queue").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_idle_event_admits_a_burst_then_meters(tmp_path, clock):
+    room = make_room(tmp_path, rate=2)
+    statuses = [room.check(1, visitor) for visitor in "abcd"]
+    assert [status["admitted"] for status in statuses] == [True, True, False, False]
+    assert [status["position"] for status in statuses[2:]] == [0, 1]
+
+    clock.now += 0.5
+    assert room.check(1, "c", join=False)["admitted"]
+    assert not room.check(1, "d", join=False)["admitted"]
+    clock.now += 0.5
+    assert room.check(1, "d", join=False)["admitted"]
+
+
+def test_events_have_separate_queues(tmp_path, clock):
+    room = make_room(tmp_path, rate=1)
+    assert room.check(1, "a")["admitted"]
+    assert room.check(2, "b")["admitted"]
+    assert not room.check(1, "c")["admitted"]
+
+
+def test_polling_never_joins(tmp_path, clock):
+    room = make_room(tmp_path, rate=1)
+    status = room.check(1, "a", join=False)
+    assert not status["admitted"] and not status["queued"]
+    assert queued(room) == 0
+    assert room.check(1, "b")["admitted"]
+
+
+def test_idle_visitors_give_up_their_place(tmp_path, clock):
+    room = make_room(tmp_path, rate=1, idle_timeout=1)
+    assert room.check(1, "a")["admitted"]
+    assert room.check(1, "b")["position"] == 0
+    assert room.check(1, "c")["position"] == 1
+
+    # c keeps polling, b left the page, so the next admission goes to c
+    clock.now += 0.6
+    assert room.check(1, "c", join=False)["position"] == 1
+    clock.now += 0.6
+    assert room.check(1, "c", join=False)["admitted"]
+    assert not room.check(1, "b", join=False)["queued"]
+
+
+def test_admission_expires(tmp_path, clock):
+    room = make_room(tmp_path, rate=1, pass_ttl=60)
+    assert room.check(1, "a")["admitted"]
+    clock.now += 30
+    assert room.check(1, "a", join=False)["admitted"]
+    clock.now += 31
+    assert not room.check(1, "a", join=False)["queued"]
+
+
+def test_disabled_room_admits_everyone(tmp_path):
+    room = make_room(tmp_path, rate=0)
+    assert all(room.check(1, visitor)["admitted"] for visitor in "abc")
+
+
+def test_queue_status_needs_a_login_and_does_not_join(app, client):
+    with app.app_context():
+        make_user("buyer")
+        event_id = make_event(make_user("organizer")).id
+    room = app.extensions["waiting_room"]
+
+    for _ in range(3):
+        assert client.get(f"/event/{event_id}/queue").status_code == 302
+    login(client, "buyer")
+    status = client.get(f"/event/{event_id}/queue").get_json()
+    assert not status["queued"]
+    assert status["next"] == f"/event/{event_id}/purchase"
+    assert queued(room) == 0
+
+    assert client.get(f"/event/{event_id}/purchase").status_code == 200
+    assert client.get(f"/event/{event_id}/queue").get_json()["admitted"]
+    assert queued(room) == 1